@@ -1,33 +1,212 @@
 
-from flask import Flask, request, jsonify
-from openai_interface import get_structured_input_from_nl
+from flask import Flask, Response, g, make_response, request, jsonify
+from openai_interface import get_parser_stats, get_structured_input_from_nl
+from nl_cache import normalize_text
+from prediction_metrics import maybe_profile, render_prometheus, snapshot, timed
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import functools
+import os
+import re
+import threading
+import uuid
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 app = Flask(__name__)
 
-AZURE_ML_URL = "https://<region>.azurewebsites.net/score"
-AZURE_ML_KEY = "<your-api-key>"
+AZURE_ML_URL = os.getenv('AZURE_ML_URL', "https://<region>.azurewebsites.net/score")
+AZURE_ML_KEY = os.getenv('AZURE_ML_KEY', "<your-api-key>")
 
-@app.route('/predict-from-nl', methods=['POST'])
-def predict_from_nl():
-    nl_text = request.json.get("input")
-    structured_input = get_structured_input_from_nl(nl_text)
+# "remote" posts to AZURE_ML_URL; "local" loads the model from MODEL_DIR once
+# at startup and scores in process through score.py
+SCORING_MODE = os.getenv('SCORING_MODE', 'remote')
+MODEL_DIR = os.getenv('MODEL_DIR', os.getenv('AZUREML_MODEL_DIR', '.'))
 
-    data = {
-        "data": [structured_input]
-    }
+# (connect, read) timeouts in seconds
+SCORING_TIMEOUT = (
+    float(os.getenv('SCORING_CONNECT_TIMEOUT', '3.05')),
+    float(os.getenv('SCORING_READ_TIMEOUT', '30')),
+)
+SCORING_RETRIES = int(os.getenv('SCORING_RETRIES', '2'))
+SCORING_MAX_CONCURRENCY = int(os.getenv('SCORING_MAX_CONCURRENCY', '32'))
+NL_BATCH_CONCURRENCY = int(os.getenv('NL_BATCH_CONCURRENCY', '16'))
+NL_BATCH_MAX_INPUTS = int(os.getenv('NL_BATCH_MAX_INPUTS', '1000'))
 
-    headers = {
+def make_scoring_session():
+    """Keep-alive session sized for SCORING_MAX_CONCURRENCY connections."""
+    retry = Retry(
+        total=SCORING_RETRIES,
+        backoff_factor=0.1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False,  # hand the last error response back as before
+        allowed_methods=frozenset(['POST']),  # scoring is idempotent
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=SCORING_MAX_CONCURRENCY,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
         "Content-Type": "application/json",
         "Authorization": f"Bearer {AZURE_ML_KEY}"
-    }
+    })
+    return session
 
-    azure_response = requests.post(AZURE_ML_URL, headers=headers, json=data)
+scoring_session = make_scoring_session()
+scoring_slots = threading.BoundedSemaphore(SCORING_MAX_CONCURRENCY)
+nl_executor = ThreadPoolExecutor(max_workers=NL_BATCH_CONCURRENCY)
 
-    return jsonify({
-        "structured_input": structured_input,
-        "prediction": azure_response.json()
-    })
+def score_remote(rows, request_id=None):
+    headers = {}
+    if request_id:
+        # x-ms-client-request-id is what Azure ML endpoints log and echo back
+        headers = {"X-Request-ID": request_id, "x-ms-client-request-id": request_id}
+    with scoring_slots:
+        response = scoring_session.post(
+            AZURE_ML_URL, json={"data": rows}, headers=headers, timeout=SCORING_TIMEOUT
+        )
+    return response.json()
+
+def to_feature_row(structured_input, as_of=None):
+    """Map an NL structured input onto the model's feature order."""
+    as_of = as_of or date.today()
+    return [
+        as_of.toordinal(),
+        float(structured_input["TOTAL_JOURNALS"]),
+        float(structured_input["TOTAL_AMOUNT"]),
+        float(structured_input["AVG_AMOUNT"]),
+    ]
+
+def score_local(rows, request_id=None):
+    return score.predict(rows, request_id).tolist()
+
+def score_predictions(rows, request_id=None):
+    """Score numeric feature rows (see to_feature_row) locally or remotely."""
+    if SCORING_MODE == 'local':
+        return score_local(rows, request_id)
+    return score_remote(rows, request_id)
+
+if SCORING_MODE == 'local':
+    import score
+    os.environ['AZUREML_MODEL_DIR'] = MODEL_DIR
+    score.init()
+elif SCORING_MODE != 'remote':
+    raise ValueError(f"SCORING_MODE must be 'remote' or 'local', not {SCORING_MODE!r}")
+
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,128}')
+
+def traced(view):
+    """Assign a request id, time the whole request and sample profiles."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request_id = request.headers.get('X-Request-ID', '')
+        # the id ends up in profile file names, so only accept safe ids
+        if not REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        g.request_id = request_id
+        with timed(f"{request.endpoint}.total"), maybe_profile(g.request_id):
+            response = make_response(view(*args, **kwargs))
+        response.headers['X-Request-ID'] = g.request_id
+        return response
+    return wrapper
+
+@app.route('/predict-from-nl', methods=['POST'])
+@traced
+def predict_from_nl():
+    nl_text = (request.get_json(silent=True) or {}).get("input")
+    if not isinstance(nl_text, str) or not normalize_text(nl_text):
+        return jsonify({"error": "'input' must be a non-empty string"}), 400
+    with timed("llm_extraction"):
+        structured_input = get_structured_input_from_nl(nl_text)
+
+    with timed("payload_build"):
+        rows = [to_feature_row(structured_input)]
+
+    with timed("scoring"):
+        prediction = score_predictions(rows, g.request_id)
+
+    with timed("serialization"):
+        return jsonify({
+            "structured_input": structured_input,
+            "prediction": prediction
+        })
+
+@app.route('/predict-from-nl/batch', methods=['POST'])
+@traced
+def predict_from_nl_batch():
+    inputs = (request.get_json(silent=True) or {}).get("inputs")
+    if not isinstance(inputs, list) or not all(isinstance(i, str) for i in inputs):
+        return jsonify({"error": "'inputs' must be a list of strings"}), 400
+    if len(inputs) > NL_BATCH_MAX_INPUTS:
+        return jsonify({"error": f"At most {NL_BATCH_MAX_INPUTS} inputs per batch"}), 400
+
+    # Identical sentences (after normalization) are parsed and scored once
+    slots = {}
+    unique_inputs = []
+    for nl_text in inputs:
+        key = normalize_text(nl_text)
+        if key not in slots:
+            slots[key] = len(unique_inputs)
+            unique_inputs.append(nl_text)
+    with timed("batch_llm_extraction"):
+        structured_inputs = list(nl_executor.map(get_structured_input_from_nl, unique_inputs))
+
+    with timed("batch_payload_build"):
+        rows = [to_feature_row(structured_input) for structured_input in structured_inputs]
+
+    with timed("batch_scoring"):
+        predictions = score_predictions(rows, g.request_id) if rows else []
+    if not isinstance(predictions, list) or len(predictions) != len(structured_inputs):
+        return jsonify({"error": "Unexpected scoring response", "prediction": predictions}), 502
+
+    with timed("batch_serialization"):
+        results = []
+        for nl_text in inputs:
+            slot = slots[normalize_text(nl_text)]
+            results.append({
+                "input": nl_text,
+                "structured_input": structured_inputs[slot],
+                "prediction": predictions[slot]
+            })
+        return jsonify({"results": results})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    stats = {
+        "stages": snapshot(),
+        "parser": get_parser_stats()
+    }
+    if SCORING_MODE == 'local' and score.router is not None:
+        stats["router"] = score.router.stats()
+    if SCORING_MODE == 'local' and score.monitor is not None:
+        stats["drift"] = score.monitor.stats()
+    return jsonify(stats)
+
+@app.route('/actuals', methods=['POST'])
+def actuals():
+    """Observed balances for an earlier request: {"request_id", "actuals": [...]}"""
+    if SCORING_MODE != 'local' or score.monitor is None:
+        return jsonify({"error": "Drift monitoring is not enabled"}), 404
+    data = request.get_json(silent=True) or {}
+    request_id = data.get("request_id")
+    values = data.get("actuals")
+    if not isinstance(request_id, str) or not isinstance(values, list):
+        return jsonify({"error": "Expected request_id and a list of actuals"}), 400
+    try:
+        matched = score.monitor.record_actuals(request_id, values)
+    except (TypeError, ValueError):
+        return jsonify({"error": "actuals must be numbers"}), 400
+    return jsonify({"request_id": request_id, "matched": matched})
 
 if __name__ == '__main__':
     app.run(port=5000, debug=True)
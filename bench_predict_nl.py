@@ -0,0 +1,132 @@
+"""Offline throughput benchmark for /predict-from-nl.
+
+Runs app.py against the stub scoring server and stub LLM from local_stubs
+and drives it with concurrent clients, reporting req/s and p50/p99
+latency. --compare repeats the run with a fresh connection per scoring
+call, like the original requests.post.
+
+    python bench_predict_nl.py --clients 32 --requests 50 --compare
+"""
+
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import requests
+
+from local_stubs import make_stub_llm, start_stub_scoring_server
+
+
+def make_inputs(n, llm_fraction, seed=0):
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(n):
+        if rng.random() < llm_fraction:
+            # unique and unparseable: misses the fast path and the cache
+            inputs.append(f"forecast request #{i} with roughly usual activity")
+        else:
+            count = rng.randint(10, 500)
+            inputs.append(
+                f"{count} journals totalling {rng.randint(1, 900)}k averaging 400"
+            )
+    return inputs
+
+
+def run_load(url, clients, requests_per_client, llm_fraction):
+    inputs = make_inputs(clients * requests_per_client, llm_fraction)
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+
+    def client(i):
+        session = requests.Session()
+        for j in range(requests_per_client):
+            text = inputs[i * requests_per_client + j]
+            start = time.perf_counter()
+            response = session.post(url, json={"input": text})
+            latencies[i].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors[i] += 1
+        session.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    all_latencies = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    n_requests = clients * requests_per_client
+    return {
+        "requests_per_sec": n_requests / elapsed,
+        "p50_ms": float(np.percentile(all_latencies, 50)),
+        "p99_ms": float(np.percentile(all_latencies, 99)),
+        "errors": sum(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="Per client")
+    parser.add_argument("--scoring-latency-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument(
+        "--llm-fraction",
+        type=float,
+        default=0.0,
+        help="Share of inputs that need the (stub) LLM",
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="Also run without pooling"
+    )
+    parser.add_argument(
+        "--model-dir", help="Score in process with this model (SCORING_MODE=local)"
+    )
+    args = parser.parse_args()
+
+    stub_server, stub_url = start_stub_scoring_server(args.scoring_latency_ms)
+    os.environ["AZURE_ML_URL"] = stub_url
+    if args.model_dir:
+        os.environ["SCORING_MODE"] = "local"
+        os.environ["MODEL_DIR"] = args.model_dir
+    os.environ.setdefault("SCORING_MAX_CONCURRENCY", str(args.clients))
+
+    import app as app_module
+    import openai_interface
+    from werkzeug.serving import make_server
+
+    openai_interface.extract_with_llm = make_stub_llm(args.llm_latency_ms)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/predict-from-nl"
+
+    runs = [("pooled", app_module.scoring_session)]
+    if args.model_dir:
+        runs = [("local", app_module.scoring_session)]
+    elif args.compare:
+        # the requests module has the same .post signature as a Session
+        runs.insert(0, ("unpooled", requests))
+    try:
+        for label, session in runs:
+            app_module.scoring_session = session
+            stub_server.connections.clear()
+            result = run_load(url, args.clients, args.requests, args.llm_fraction)
+            print(
+                f"{label:>9}: {result['requests_per_sec']:,.0f} req/s, "
+                f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+                f"errors {result['errors']}, "
+                f"scoring connections {len(stub_server.connections)}"
+            )
+    finally:
+        server.shutdown()
+        stub_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Offline bulk scoring with the balance model.
+
+Streams a CSV or Parquet file of feature rows (or a journal feature store
+directory, see feature_store.py) in chunks, scores the chunks
+in a pool of worker processes (each loads the model once) and appends the
+predictions to the output file in input order as they complete. Every
+output row carries DATE (derived from DATE_ORDINAL if the input has no
+DATE column) and SAP_BOOK_ID when the input has one.
+
+    python bulk_score.py history.parquet predictions.csv --model balance_model.npz
+    python bulk_score.py features/journal_agg predictions.parquet --keep-columns
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import FEATURE_COLUMNS, load_model
+from date_features import UNIX_EPOCH_ORDINAL, date_ordinal
+from feature_store import KEY_COLUMNS, JournalFeatureStore
+from model_fleet import is_fleet
+
+ID_COLUMNS = ["DATE", "SAP_BOOK_ID"]
+
+_model = None
+
+
+def _init_worker(model_path):
+    global _model
+    _model = load_model(model_path)
+
+
+def _score_chunk(X, groups=None):
+    if groups is None:
+        return np.asarray(_model.predict(X), dtype=np.float64)
+    return np.asarray(_model.predict(X, groups), dtype=np.float64)
+
+
+def default_model_path():
+    for name in ("balance_model.npz", "balance_model.pkl"):
+        if os.path.exists(name):
+            return name
+    return "balance_model.pkl"
+
+
+def id_columns(path):
+    """The ID_COLUMNS present in a CSV, Parquet file or feature store."""
+    if JournalFeatureStore.exists(path):
+        names = KEY_COLUMNS
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        names = pq.read_schema(path).names
+    else:
+        names = pd.read_csv(path, nrows=0).columns
+    return [column for column in ID_COLUMNS if column in names]
+
+
+def ordinal_dates(ordinals):
+    """Inverse of ``date_ordinal``: datetime64 dates for DATE_ORDINAL values."""
+    days = np.asarray(ordinals, dtype=np.int64) - UNIX_EPOCH_ORDINAL
+    return days.astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def read_chunks(path, chunksize, columns=None):
+    """Yield DataFrames of at most ``chunksize`` rows from a CSV or Parquet file."""
+    if JournalFeatureStore.exists(path):
+        for frame in JournalFeatureStore(path).iter_frames():
+            frame["DATE_ORDINAL"] = date_ordinal(frame["DATE"])
+            for offset in range(0, len(frame), chunksize):
+                chunk = frame.iloc[offset : offset + chunksize]
+                yield chunk if columns is None else chunk[columns]
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+
+
+class PredictionWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._wrote_header = False
+
+    def write(self, frame):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(
+                self.path,
+                mode="a" if self._wrote_header else "w",
+                header=not self._wrote_header,
+                index=False,
+            )
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def bulk_score(
+    input_path,
+    output_path,
+    model_path=None,
+    chunksize=250_000,
+    workers=None,
+    keep_columns=False,
+    progress=True,
+):
+    """Score every row of ``input_path``; returns (rows, seconds).
+
+    ``workers=0`` scores in the calling process, which avoids pickling
+    chunks to workers and is often faster for the linear model.
+    """
+    model_path = model_path or default_model_path()
+    workers = os.cpu_count() if workers is None else workers
+    fleet = is_fleet(model_path)
+    ids = id_columns(input_path)
+    if fleet and "SAP_BOOK_ID" not in ids:
+        # a per-book fleet needs the book id of every row
+        raise ValueError(f"{input_path} has no SAP_BOOK_ID column to pick models by")
+    key_columns = ids + FEATURE_COLUMNS
+    columns = None if keep_columns else key_columns
+
+    def inputs(frame):
+        X = frame[FEATURE_COLUMNS].to_numpy(np.float64)
+        if not fleet:
+            return (X,)
+        return X, frame["SAP_BOOK_ID"].to_numpy()
+
+    writer = PredictionWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    def emit(frame, predictions):
+        nonlocal rows
+        out = frame if keep_columns else frame[key_columns]
+        if "DATE" not in ids:
+            out = out.copy()
+            out.insert(0, "DATE", ordinal_dates(out["DATE_ORDINAL"]))
+        out = out.assign(PREDICTION=predictions)
+        writer.write(out)
+        rows += len(out)
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"  {rows:,} rows scored ({rows / elapsed:,.0f} rows/s)")
+
+    try:
+        if workers == 0:
+            _init_worker(model_path)
+            for frame in read_chunks(input_path, chunksize, columns):
+                emit(frame, _score_chunk(*inputs(frame)))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(model_path,)
+            ) as pool:
+                pending = deque()
+                for frame in read_chunks(input_path, chunksize, columns):
+                    pending.append((frame, pool.submit(_score_chunk, *inputs(frame))))
+                    # bound memory to a couple of chunks per worker
+                    while len(pending) >= 2 * workers:
+                        frame, future = pending.popleft()
+                        emit(frame, future.result())
+                while pending:
+                    frame, future = pending.popleft()
+                    emit(frame, future.result())
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "input", help="CSV or Parquet file of feature rows, or a feature store"
+    )
+    parser.add_argument("output", help="CSV or Parquet file for predictions")
+    parser.add_argument(
+        "--model", help="balance_model.npz/.json/.pkl or a balance_fleet.npz"
+    )
+    parser.add_argument("--chunksize", type=int, default=250_000)
+    parser.add_argument("--workers", type=int, default=None, help="0 scores in-process")
+    parser.add_argument(
+        "--keep-columns", action="store_true", help="Copy all input columns"
+    )
+    args = parser.parse_args()
+
+    rows, seconds = bulk_score(
+        args.input,
+        args.output,
+        args.model,
+        args.chunksize,
+        args.workers,
+        args.keep_columns,
+    )
+    print(f"Scored {rows:,} rows in {seconds:.2f}s ({rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Pickle-free representation of the linear balance model.
+
+A fitted LinearRegression (optionally behind a StandardScaler in a
+Pipeline) is exported to an .npz or .json artifact with its coefficients,
+intercept, feature order and scaler parameters. CompiledLinearModel scores
+it with a single ``X @ coef + intercept``, without importing scikit-learn.
+
+    python compiled_model.py balance_model.pkl balance_model.npz
+"""
+
+import argparse
+import json
+import os
+import warnings
+
+import numpy as np
+
+FEATURE_COLUMNS = [
+    "DATE_ORDINAL",
+    "JOURNAL_COUNT",
+    "JOURNAL_TOTAL_AMOUNT",
+    "JOURNAL_AVG_AMOUNT",
+]
+
+
+def _unwrap(model):
+    """Split a fitted estimator into (scaler or None, linear model)."""
+    scaler = None
+    if hasattr(model, "steps"):
+        *transforms, (_, model) = model.steps
+        for _, step in transforms:
+            if not (hasattr(step, "mean_") and hasattr(step, "scale_")):
+                raise ValueError(f"Unsupported pipeline step: {type(step).__name__}")
+            if scaler is not None:
+                raise ValueError("Only one scaling step is supported")
+            scaler = step
+    if not hasattr(model, "coef_"):
+        raise ValueError(f"Not a linear model: {type(model).__name__}")
+    return scaler, model
+
+
+def export_model(model, path, feature_names=None):
+    """Write a fitted linear model to ``path`` (.npz or .json)."""
+    scaler, linear = _unwrap(model)
+    coef = np.asarray(linear.coef_, dtype=np.float64).ravel()
+    if feature_names is None:
+        names = getattr(model, "feature_names_in_", None)
+        feature_names = list(names) if names is not None else FEATURE_COLUMNS
+    if len(feature_names) != len(coef):
+        raise ValueError(
+            f"{len(feature_names)} feature names for {len(coef)} coefficients"
+        )
+    artifact = {
+        "coef": coef,
+        "intercept": np.float64(np.ravel(linear.intercept_)[0]),
+        "feature_names": np.asarray(feature_names, dtype=str),
+    }
+    if scaler is not None:
+        # with_mean=False still sets mean_, but transform never subtracts it
+        mean = scaler.mean_ if getattr(scaler, "with_mean", True) else None
+        scale = scaler.scale_
+        artifact["scaler_mean"] = (
+            np.zeros(len(coef)) if mean is None else np.asarray(mean, dtype=np.float64)
+        )
+        artifact["scaler_scale"] = (
+            np.ones(len(coef)) if scale is None else np.asarray(scale, dtype=np.float64)
+        )
+
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(
+                {k: np.asarray(v).tolist() for k, v in artifact.items()}, f, indent=4
+            )
+    else:
+        np.savez(path, **artifact)
+    return path
+
+
+class CompiledLinearModel:
+    """Score a linear model as ``X @ coef + intercept``.
+
+    Scaler parameters are folded into the coefficients at load time, so
+    prediction is one matrix-vector product with no input validation.
+    """
+
+    def __init__(
+        self, coef, intercept, feature_names, scaler_mean=None, scaler_scale=None
+    ):
+        coef = np.asarray(coef, dtype=np.float64)
+        intercept = float(intercept)
+        # a scaler without centring or scaling has no mean or scale
+        if scaler_scale is not None:
+            coef = coef / np.asarray(scaler_scale, dtype=np.float64)
+        if scaler_mean is not None:
+            intercept -= float(np.asarray(scaler_mean, dtype=np.float64) @ coef)
+        self.coef = coef
+        self.intercept = intercept
+        self.feature_names = list(feature_names)
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".json"):
+            with open(path, "r") as f:
+                artifact = json.load(f)
+        else:
+            with np.load(path, allow_pickle=False) as npz:
+                artifact = {key: npz[key] for key in npz.files}
+        return cls(
+            artifact["coef"],
+            artifact["intercept"],
+            [str(name) for name in artifact["feature_names"]],
+            artifact.get("scaler_mean"),
+            artifact.get("scaler_scale"),
+        )
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.coef):
+            raise ValueError(
+                f"X has {X.shape[1]} features, model expects {len(self.coef)}"
+            )
+        return X @ self.coef + self.intercept
+
+
+def load_model(path):
+    """Load a compiled (.npz/.json), fleet (.npz) or pickled model from ``path``."""
+    from model_fleet import ModelFleet, is_fleet
+
+    if is_fleet(path):
+        return ModelFleet.load(path)
+    if path.endswith((".npz", ".json")):
+        return CompiledLinearModel.load(path)
+    import joblib
+
+    return joblib.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model", help="Pickled model, e.g. balance_model.pkl")
+    parser.add_argument("output", nargs="?", help="Defaults to <model>.npz")
+    args = parser.parse_args()
+
+    import joblib
+
+    model = joblib.load(args.model)
+    output = args.output or os.path.splitext(args.model)[0] + ".npz"
+    export_model(model, output)
+
+    compiled = CompiledLinearModel.load(output)
+    X = np.random.default_rng(0).normal(size=(1000, len(compiled.coef))) * 1000
+    with warnings.catch_warnings():
+        # the pickled model may have been fitted on a DataFrame
+        warnings.simplefilter("ignore", UserWarning)
+        expected = model.predict(X)
+    diff = np.abs(compiled.predict(X) - expected).max()
+    print(f"Exported {args.model} -> {output} (max abs diff {diff:.3g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Rolling-origin cross-validation and model search for the balance model.
+
+The training frame is cut into ``n_folds + 1`` contiguous date blocks; fold
+k trains on blocks 0..k and tests on block k+1 (an expanding window, so no
+fold ever sees the future). Fold matrices are built once, dumped to
+``cache_dir`` keyed by a hash of the data, and memory-mapped by the worker
+processes, so every candidate reuses the same arrays. Each (candidate,
+params, fold) fit is one joblib task.
+
+    python cv_harness.py --data-dir ./data --folds 5 --jobs -1
+    python cv_harness.py --feature-store features/journal_agg --candidates ridge gbr
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from compiled_model import FEATURE_COLUMNS
+from feature_store import JournalFeatureStore
+from model_fleet import ModelFleet
+from training_pipeline import (
+    LocalFileSource,
+    build_training_frame,
+    load_balances,
+    load_journal_agg,
+)
+
+TARGET_COLUMN = "BALANCE"
+GROUP_COLUMN = "SAP_BOOK_ID"
+
+Candidate = namedtuple("Candidate", ["name", "build", "grid", "grouped"])
+
+
+def build_linear():
+    return LinearRegression()
+
+
+def build_ridge(alpha=1.0):
+    return make_pipeline(StandardScaler(), Ridge(alpha=alpha))
+
+
+def build_gbr(max_iter=200, learning_rate=0.1, max_leaf_nodes=31):
+    return HistGradientBoostingRegressor(
+        max_iter=max_iter,
+        learning_rate=learning_rate,
+        max_leaf_nodes=max_leaf_nodes,
+        random_state=0,
+    )
+
+
+def build_fleet(min_rows=20, alpha=1e-3):
+    return ModelFleet(min_rows=min_rows, alpha=alpha)
+
+
+CANDIDATES = {
+    "linear": Candidate("linear", build_linear, [{}], False),
+    "ridge": Candidate(
+        "ridge", build_ridge, [{"alpha": a} for a in (0.1, 1.0, 10.0, 100.0)], False
+    ),
+    "gbr": Candidate(
+        "gbr",
+        build_gbr,
+        [
+            {"max_iter": n, "learning_rate": lr, "max_leaf_nodes": 31}
+            for n in (100, 300)
+            for lr in (0.05, 0.1)
+        ],
+        False,
+    ),
+    "per_book": Candidate(
+        "per_book",
+        build_fleet,
+        [{"min_rows": m, "alpha": a} for m in (20, 100) for a in (1e-3, 1.0)],
+        True,
+    ),
+}
+
+
+def rolling_origin_folds(dates, n_folds=5, gap_days=0):
+    """Yield (train_end, test_start, test_end) timestamps for each fold."""
+    unique = np.unique(dates.to_numpy().astype("datetime64[D]"))
+    if len(unique) < n_folds + 1:
+        raise ValueError(
+            f"need at least {n_folds + 1} distinct dates for {n_folds} folds"
+        )
+    edges = np.linspace(0, len(unique), n_folds + 2).astype(int)
+    gap = np.timedelta64(gap_days, "D")
+    for k in range(n_folds):
+        test_start = unique[edges[k + 1]]
+        test_end = unique[edges[k + 2] - 1]
+        train_end = test_start - np.timedelta64(1, "D") - gap
+        yield pd.Timestamp(train_end), pd.Timestamp(test_start), pd.Timestamp(test_end)
+
+
+def _data_key(frame, n_folds, gap_days):
+    columns = ["DATE", GROUP_COLUMN, TARGET_COLUMN] + FEATURE_COLUMNS
+    h = hashlib.sha256(pd.util.hash_pandas_object(frame[columns], index=False).values)
+    h.update(json.dumps({"folds": n_folds, "gap_days": gap_days}).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def cache_folds(frame, n_folds=5, cache_dir=".cv_cache", gap_days=0):
+    """Build and dump the fold matrices once; returns one dict per fold."""
+    directory = os.path.join(cache_dir, _data_key(frame, n_folds, gap_days))
+    os.makedirs(directory, exist_ok=True)
+    dates = frame["DATE"]
+    X = frame[FEATURE_COLUMNS].to_numpy(np.float64)
+    y = frame[TARGET_COLUMN].to_numpy(np.float64)
+    groups = pd.factorize(frame[GROUP_COLUMN])[0]
+
+    folds = []
+    for k, (train_end, test_start, test_end) in enumerate(
+        rolling_origin_folds(dates, n_folds, gap_days)
+    ):
+        path = os.path.join(directory, f"fold-{k}.joblib")
+        if not os.path.exists(path):
+            train = (dates <= train_end).to_numpy()
+            test = ((dates >= test_start) & (dates <= test_end)).to_numpy()
+            arrays = {
+                "X_train": X[train],
+                "y_train": y[train],
+                "g_train": groups[train],
+                "X_test": X[test],
+                "y_test": y[test],
+                "g_test": groups[test],
+            }
+            joblib.dump(arrays, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        folds.append(
+            {
+                "fold": k,
+                "path": path,
+                "train_end": train_end.date().isoformat(),
+                "test_start": test_start.date().isoformat(),
+                "test_end": test_end.date().isoformat(),
+            }
+        )
+    return folds
+
+
+def run_fold(candidate, params, fold):
+    """Fit one candidate on one fold and score it."""
+    data = joblib.load(fold["path"], mmap_mode="r")
+    model = candidate.build(**params)
+    start = time.perf_counter()
+    if candidate.grouped:
+        model.fit(data["X_train"], data["y_train"], data["g_train"])
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(data["X_test"], data["g_test"])
+    else:
+        model.fit(data["X_train"], data["y_train"])
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(data["X_test"])
+    y_test = data["y_test"]
+    return {
+        "candidate": candidate.name,
+        "params": json.dumps(params, sort_keys=True),
+        "fold": fold["fold"],
+        "test_start": fold["test_start"],
+        "train_rows": len(data["y_train"]),
+        "test_rows": len(y_test),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        "r2": float(r2_score(y_test, y_pred)) if len(y_test) > 1 else float("nan"),
+        "fit_seconds": fit_seconds,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_search(
+    frame,
+    candidates=None,
+    n_folds=5,
+    n_jobs=-1,
+    cache_dir=".cv_cache",
+    gap_days=0,
+):
+    """Cross-validate every candidate/params combination.
+
+    Returns (per-fold results, per-candidate summary sorted by mean RMSE,
+    wall seconds).
+    """
+    candidates = [
+        CANDIDATES[c] if isinstance(c, str) else c
+        for c in (candidates or list(CANDIDATES))
+    ]
+    start = time.perf_counter()
+    folds = cache_folds(frame, n_folds, cache_dir, gap_days)
+    tasks = [
+        delayed(run_fold)(candidate, params, fold)
+        for candidate in candidates
+        for params in candidate.grid
+        for fold in folds
+    ]
+    results = pd.DataFrame(Parallel(n_jobs=n_jobs)(tasks))
+    wall_seconds = time.perf_counter() - start
+
+    summary = (
+        results.groupby(["candidate", "params"])
+        .agg(
+            mae=("mae", "mean"),
+            rmse=("rmse", "mean"),
+            r2=("r2", "mean"),
+            fit_seconds=("fit_seconds", "sum"),
+        )
+        .sort_values("rmse")
+        .reset_index()
+    )
+    return results, summary, wall_seconds
+
+
+def load_frame(args):
+    source = LocalFileSource(args.data_dir)
+    df = load_balances(source, args.balance_file)
+    if args.feature_store:
+        journal_agg = JournalFeatureStore(args.feature_store).read()
+    else:
+        journal_agg = load_journal_agg(source, args.journal_file)
+    return build_training_frame(df, journal_agg)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--balance-file", default="balance_records.json")
+    parser.add_argument("--journal-file", default="journal_entries.json")
+    parser.add_argument("--feature-store", help="Read journal aggregates from here")
+    parser.add_argument(
+        "--candidates", nargs="+", choices=list(CANDIDATES), default=list(CANDIDATES)
+    )
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--gap-days", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--cache-dir", default=".cv_cache")
+    parser.add_argument("--report", help="Write per-fold results to this CSV")
+    args = parser.parse_args()
+
+    frame = load_frame(args)
+    results, summary, wall_seconds = run_search(
+        frame, args.candidates, args.folds, args.jobs, args.cache_dir, args.gap_days
+    )
+    if args.report:
+        results.to_csv(args.report, index=False)
+
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(
+            results[
+                ["candidate", "params", "fold", "test_start", "mae", "rmse", "r2"]
+            ].to_string(index=False)
+        )
+        print()
+        print(summary.to_string(index=False))
+    best = summary.iloc[0]
+    print(
+        f"\nBest: {best['candidate']} {best['params']} "
+        f"(MAE {best['mae']:.2f}, RMSE {best['rmse']:.2f}, R² {best['r2']:.2f})"
+    )
+    print(
+        f"{len(results)} fits in {wall_seconds:.1f}s wall, "
+        f"{results['seconds'].sum():.1f}s of model time"
+    )
+
+
+if __name__ == "__main__":
+    main()
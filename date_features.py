@@ -0,0 +1,298 @@
+"""Vectorised date and journal feature engineering.
+
+Replaces the per-row Python in train_predict.ipynb
+(``DATE.map(datetime.toordinal)``) and newstand.txt (``count_transaction_type``
+and ``count_source_system`` applied over per-group lists) with datetime64
+arithmetic and grouped counts. ``python date_features.py`` checks that both
+versions produce identical values and times them.
+
+    python date_features.py --rows 1000000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# days between 0001-01-01 (ordinal 1) and 1970-01-01
+UNIX_EPOCH_ORDINAL = 719163
+TRANSACTION_TYPES = ("Credit", "Debit", "Adjustment")
+SOURCE_SYSTEMS = ("SAP", "Oracle", "Manual")
+JOURNAL_KEYS = ["SAP_BOOK_ID", "DATE"]
+
+
+def _days(dates):
+    """Days since 1970-01-01 as int64 (dates are floored to the day)."""
+    return (
+        np.asarray(dates, dtype="datetime64[ns]")
+        .astype("datetime64[D]")
+        .astype(np.int64)
+    )
+
+
+def days_since_epoch(dates):
+    return pd.Series(_days(dates), index=getattr(dates, "index", None))
+
+
+def date_ordinal(dates):
+    """Vectorised ``datetime.toordinal`` for a datetime Series."""
+    return pd.Series(
+        _days(dates) + UNIX_EPOCH_ORDINAL, index=getattr(dates, "index", None)
+    )
+
+
+def calendar_features(dates):
+    """Calendar columns for a datetime Series, one row per date.
+
+    DAY_OF_WEEK is 0 for Monday as in ``Series.dt.dayofweek``.
+    """
+    day = np.asarray(dates, dtype="datetime64[ns]").astype("datetime64[D]")
+    month_start = day.astype("datetime64[M]")
+    year_start = day.astype("datetime64[Y]")
+    days = day.astype(np.int64)
+    month = (month_start - year_start).astype(np.int64) + 1
+    # 1970-01-01 was a Thursday
+    day_of_week = (days + 3) % 7
+    is_month_end = (day + 1).astype("datetime64[M]") != month_start
+    return pd.DataFrame(
+        {
+            "YEAR": year_start.astype(np.int64) + 1970,
+            "MONTH": month,
+            "QUARTER": (month - 1) // 3 + 1,
+            "DAY_OF_WEEK": day_of_week,
+            "IS_WEEKEND": (day_of_week >= 5).astype(np.int64),
+            "IS_MONTH_END": is_month_end.astype(np.int64),
+            "IS_QUARTER_END": (is_month_end & (month % 3 == 0)).astype(np.int64),
+            "DAYS_SINCE_EPOCH": days,
+            "DATE_ORDINAL": days + UNIX_EPOCH_ORDINAL,
+        },
+        index=getattr(dates, "index", None),
+    )
+
+
+def _count_columns(journal_df, keys, column, values, name):
+    counts = (
+        journal_df.groupby(keys + [column], sort=False)
+        .size()
+        .unstack(column, fill_value=0)
+        .reindex(columns=list(values), fill_value=0)
+    )
+    counts.columns = [name.format(value.upper()) for value in values]
+    return counts
+
+
+def journal_day_features(
+    journal_df,
+    transaction_types=TRANSACTION_TYPES,
+    source_systems=SOURCE_SYSTEMS,
+):
+    """Per (SAP_BOOK_ID, day) journal features from newstand.txt.
+
+    JOURNAL_* amount statistics, per-type counts (CREDIT_COUNT, ...),
+    per-source ratios (SAP_ENTRIES_RATIO, ...), APPROVED_RATIO and
+    AVG_POSTING_DELAY, computed with grouped counts instead of lists.
+    """
+    frame = pd.DataFrame(
+        {
+            "SAP_BOOK_ID": journal_df["SAP_BOOK_ID"],
+            "DATE": pd.to_datetime(journal_df["ENTRY_DATE"]).dt.normalize(),
+            "VALUE": journal_df["VALUE"],
+            "TRANSACTION_TYPE": journal_df["TRANSACTION_TYPE"],
+            "SOURCE_SYSTEM": journal_df["SOURCE_SYSTEM"],
+            "APPROVED": journal_df["APPROVED_BY"].notna(),
+            "POSTING_DELAY": (
+                pd.to_datetime(journal_df["POSTING_DATE"])
+                - pd.to_datetime(journal_df["ENTRY_DATE"])
+            ).dt.days,
+        }
+    )
+    grouped = frame.groupby(JOURNAL_KEYS)
+    features = grouped.agg(
+        JOURNAL_TOTAL_AMOUNT=("VALUE", "sum"),
+        JOURNAL_AVG_AMOUNT=("VALUE", "mean"),
+        JOURNAL_STD_AMOUNT=("VALUE", "std"),
+        JOURNAL_COUNT=("VALUE", "count"),
+        APPROVED_COUNT=("APPROVED", "sum"),
+        AVG_POSTING_DELAY=("POSTING_DELAY", "mean"),
+    )
+    features["JOURNAL_STD_AMOUNT"] = features["JOURNAL_STD_AMOUNT"].fillna(0)
+    features["AVG_POSTING_DELAY"] = features["AVG_POSTING_DELAY"].fillna(0)
+
+    features = features.join(
+        _count_columns(
+            frame, JOURNAL_KEYS, "TRANSACTION_TYPE", transaction_types, "{}_COUNT"
+        )
+    )
+    denominator = features["JOURNAL_COUNT"].clip(lower=1)
+    sources = _count_columns(
+        frame, JOURNAL_KEYS, "SOURCE_SYSTEM", source_systems, "{}_ENTRIES_RATIO"
+    )
+    features = features.join(sources.div(denominator.reindex(sources.index), axis=0))
+    features["APPROVED_RATIO"] = (
+        features.pop("APPROVED_COUNT") / features["JOURNAL_COUNT"]
+    )
+    return features.reset_index()
+
+
+# Reference implementations, kept for the equivalence check and benchmark.
+
+
+def _reference_date_ordinal(dates):
+    return dates.map(datetime.toordinal)
+
+
+def _reference_journal_day_features(journal_df):
+    journal_df = journal_df.copy()
+    journal_df["ENTRY_DATE"] = pd.to_datetime(journal_df["ENTRY_DATE"])
+    journal_df["POSTING_DATE"] = pd.to_datetime(journal_df["POSTING_DATE"])
+    journal_agg = (
+        journal_df.groupby(["SAP_BOOK_ID", journal_df["ENTRY_DATE"].dt.date])
+        .agg(
+            {
+                "VALUE": ["sum", "mean", "std", "count"],
+                "TRANSACTION_TYPE": lambda x: list(x),
+                "SOURCE_SYSTEM": lambda x: list(x),
+                "APPROVED_BY": lambda x: sum(1 for v in x if pd.notna(v)),
+            }
+        )
+        .reset_index()
+    )
+    journal_agg.columns = [
+        "SAP_BOOK_ID",
+        "DATE",
+        "JOURNAL_TOTAL_AMOUNT",
+        "JOURNAL_AVG_AMOUNT",
+        "JOURNAL_STD_AMOUNT",
+        "JOURNAL_COUNT",
+        "TRANSACTION_TYPES",
+        "SOURCE_SYSTEMS",
+        "APPROVED_COUNT",
+    ]
+    journal_agg["DATE"] = pd.to_datetime(journal_agg["DATE"])
+    journal_agg["JOURNAL_STD_AMOUNT"] = journal_agg["JOURNAL_STD_AMOUNT"].fillna(0)
+
+    def count_transaction_type(types_list, target_type):
+        return sum(1 for t in types_list if t == target_type)
+
+    for name in TRANSACTION_TYPES:
+        journal_agg[f"{name.upper()}_COUNT"] = journal_agg["TRANSACTION_TYPES"].apply(
+            lambda x: count_transaction_type(x, name)
+        )
+
+    def count_source_system(systems_list, target_system):
+        return sum(1 for s in systems_list if s == target_system)
+
+    for name in SOURCE_SYSTEMS:
+        journal_agg[f"{name.upper()}_ENTRIES_RATIO"] = journal_agg.apply(
+            lambda row: count_source_system(row["SOURCE_SYSTEMS"], name)
+            / max(row["JOURNAL_COUNT"], 1),
+            axis=1,
+        )
+    journal_agg["APPROVED_RATIO"] = (
+        journal_agg["APPROVED_COUNT"] / journal_agg["JOURNAL_COUNT"]
+    )
+    posting_delays = (
+        journal_df.groupby(["SAP_BOOK_ID", journal_df["ENTRY_DATE"].dt.date])
+        .apply(lambda x: (x["POSTING_DATE"] - x["ENTRY_DATE"]).dt.days.mean())
+        .reset_index()
+    )
+    posting_delays.columns = ["SAP_BOOK_ID", "DATE", "AVG_POSTING_DELAY"]
+    posting_delays["DATE"] = pd.to_datetime(posting_delays["DATE"])
+    journal_agg = journal_agg.merge(
+        posting_delays, on=["SAP_BOOK_ID", "DATE"], how="left"
+    )
+    journal_agg["AVG_POSTING_DELAY"] = journal_agg["AVG_POSTING_DELAY"].fillna(0)
+    return journal_agg.drop(
+        ["TRANSACTION_TYPES", "SOURCE_SYSTEMS", "APPROVED_COUNT"], axis=1
+    )
+
+
+def make_journal_sample(n_rows, n_books=50, seed=0):
+    """Synthetic journal entries with the newstand.txt columns."""
+    rng = np.random.default_rng(seed)
+    entry = pd.Timestamp("2018-01-01") + pd.to_timedelta(
+        rng.integers(0, 7 * 365 * 24, n_rows), unit="h"
+    )
+    approvers = np.array(["manager_1", "manager_2", None], dtype=object)
+    return pd.DataFrame(
+        {
+            "SAP_BOOK_ID": np.char.add(
+                "SAP", rng.integers(1, n_books + 1, n_rows).astype(str)
+            ),
+            "ENTRY_DATE": entry,
+            "POSTING_DATE": entry
+            + pd.to_timedelta(rng.integers(0, 4, n_rows), unit="D"),
+            "VALUE": rng.normal(0, 5000, n_rows).round(2),
+            "TRANSACTION_TYPE": rng.choice(list(TRANSACTION_TYPES), n_rows),
+            "SOURCE_SYSTEM": rng.choice(list(SOURCE_SYSTEMS), n_rows),
+            "APPROVED_BY": approvers[rng.integers(0, 3, n_rows)],
+        }
+    )
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark(n_rows=1_000_000, n_journal_rows=200_000):
+    """Check both implementations agree and return their timings in seconds."""
+    dates = pd.Series(
+        pd.Timestamp("2018-01-01")
+        + pd.to_timedelta(
+            np.random.default_rng(0).integers(0, 7 * 365, n_rows), unit="D"
+        )
+    )
+    expected, reference_seconds = _timed(_reference_date_ordinal, dates)
+    actual, seconds = _timed(date_ordinal, dates)
+    if not np.array_equal(expected.to_numpy(np.int64), actual.to_numpy()):
+        raise AssertionError("date_ordinal differs from datetime.toordinal")
+    results = {"date_ordinal": (reference_seconds, seconds)}
+
+    calendar, seconds = _timed(calendar_features, dates)
+    reference_calendar = pd.DataFrame(
+        {
+            "MONTH": dates.dt.month,
+            "QUARTER": dates.dt.quarter,
+            "DAY_OF_WEEK": dates.dt.dayofweek,
+            "IS_MONTH_END": dates.dt.is_month_end.astype(np.int64),
+            "IS_QUARTER_END": dates.dt.is_quarter_end.astype(np.int64),
+            "DAYS_SINCE_EPOCH": (dates - pd.Timestamp("1970-01-01")).dt.days,
+        }
+    )
+    for column in reference_calendar:
+        if not np.array_equal(
+            reference_calendar[column].to_numpy(np.int64), calendar[column].to_numpy()
+        ):
+            raise AssertionError(f"calendar feature {column} differs")
+
+    journal_df = make_journal_sample(n_journal_rows)
+    expected, reference_seconds = _timed(_reference_journal_day_features, journal_df)
+    actual, seconds = _timed(journal_day_features, journal_df)
+    expected = expected.sort_values(JOURNAL_KEYS, ignore_index=True)
+    actual = actual.sort_values(JOURNAL_KEYS, ignore_index=True)[expected.columns]
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+    results["journal_day_features"] = (reference_seconds, seconds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Dates to convert")
+    parser.add_argument("--journal-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for name, (reference, vectorised) in benchmark(
+        args.rows, args.journal_rows
+    ).items():
+        print(
+            f"{name}: {reference * 1000:,.1f} ms -> {vectorised * 1000:,.1f} ms "
+            f"({reference / vectorised:,.0f}x), identical values"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,130 +1,714 @@
-from azure.identity import DefaultAzureCredential
-from azure.ai.ml import MLClient
-from azure.ai.ml.entities import ManagedOnlineEndpoint, ManagedOnlineDeployment
-from azure.ai.ml.entities import Model as MLModel, Environment
-import uuid
-from azure.mgmt.resource import ResourceManagementClient
-
-# Set these values
-subscription_id = "9570e3d5-306e-462c-a985-1e469e85a0c8"
-resource_group = "test"
-workspace = "predictivesapui"
-
-# ✅ Test authentication first
-try:
-    credential = DefaultAzureCredential()
-    # Test authentication - USE THE ACTUAL SUBSCRIPTION ID
-    resource_client = ResourceManagementClient(credential, subscription_id)
-    print("✅ Authentication successful")
-except Exception as e:
-    print(f"❌ Authentication failed: {e}")
-    exit(1)
-
-# ✅ Test ML Client connection
-try:
-    ml_client = MLClient(
-        credential=credential,
-        subscription_id=subscription_id,
-        resource_group_name=resource_group,
-        workspace_name=workspace
+"""Deploy the balance model to an Azure ML managed online endpoint.
+
+Deployment is a small plan of steps with dependencies, run by
+``PlanExecutor``:
+
+    auth -> workspace -> model ------\\
+                      -> environment --> deployment -> traffic -> details
+                      -> endpoint ----/
+
+Independent steps run concurrently (model registration, environment and
+endpoint provisioning overlap). Every step looks before it creates:
+
+* the model version is the content hash of the artifact, staged as
+  ``balance_model/balance_model.{npz,pkl}`` so score.py finds it under
+  AZUREML_MODEL_DIR,
+* the environment version is the hash of environment.yml,
+* the endpoint has a stable name and is reused when it exists,
+* the deployment is named after the model, environment and code hashes,
+
+so re-running with nothing changed creates nothing. Completed steps are
+recorded with their timings in ``--state`` and skipped on the next run
+while their inputs are unchanged, which lets a failed deploy resume from
+the failing step. ``--backend fake`` runs the same plan against an
+in-process stand-in for the Azure clients.
+
+The subscription, resource group and workspace are read from ``--config``
+(``subscription_id``, ``resource_group`` and ``workspace_name`` in
+config.json) rather than hardcoded. ``--code-path`` (the folder holding
+score.py) and ``--conda-file`` must exist; a missing one fails the deploy
+before anything is created.
+
+    python deploy.py --model balance_model.pkl
+    python deploy.py --registry models --traffic 10   # canary the current version
+    python deploy.py --backend fake --fake-latency 0.5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MODEL_NAME = "balance-predictor"
+ENDPOINT_NAME = "balance-predictor"
+ENVIRONMENT_NAME = "balance-env"
+SCORING_SCRIPT = "score.py"
+# uploaded model folder and the artifacts score.py loads from it
+MODEL_FOLDER = "balance_model"
+MODEL_EXTENSIONS = (".npz", ".pkl")
+ENVIRONMENT_IMAGE = (
+    "mcr.microsoft.com/azureml/minimal-ubuntu20.04-py38-cpu-inference:latest"
+)
+
+
+class DeployError(Exception):
+    """A deploy step failed."""
+
+
+# ``inputs`` are the config keys a step reads; with the dependency results
+# they make up the key under which a completed step is recorded
+Step = namedtuple("Step", ["name", "deps", "inputs", "run", "cacheable"])
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def tree_digest(path):
+    """Hash of every file name and content under ``path``."""
+    if not os.path.exists(path):
+        # os.walk of a missing path is silently empty
+        raise DeployError(f"{path} does not exist")
+    if os.path.isfile(path):
+        return file_digest(path)
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            h.update(os.path.relpath(full, path).encode("utf-8") + b"\0")
+            h.update(file_digest(full).encode("ascii"))
+    return h.hexdigest()
+
+
+# Backends
+
+
+class FakeBackend:
+    """In-memory stand-in for the Azure ML clients.
+
+    ``latency`` seconds are slept per create call to mimic provisioning;
+    ``fail`` names a method that raises, to exercise resume. With ``path``
+    the fake cloud is kept in a JSON file so it outlives the process, like
+    the real one. ``calls`` records every call for inspection.
+    """
+
+    def __init__(self, latency=0.0, fail=None, path=None):
+        self.latency = latency
+        self.fail = fail
+        self.path = path
+        self.calls = []
+        self.resources = {
+            "models": {},
+            "environments": {},
+            "endpoints": {},
+            "deployments": {},
+            "traffic": {},
+        }
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.resources.update(json.load(f))
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args):
+        with self._lock:
+            self.calls.append((method,) + args)
+        if method == self.fail:
+            raise RuntimeError(f"fake failure in {method}")
+
+    def _provision(self, kind, key, value):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.resources[kind][key] = value
+            if self.path:
+                with open(self.path, "w") as f:
+                    json.dump(self.resources, f, indent=2, sort_keys=True)
+        return value
+
+    def check_auth(self):
+        self._call("check_auth")
+
+    def workspace_name(self):
+        self._call("workspace_name")
+        return "fake-workspace"
+
+    def get_model(self, name, version):
+        self._call("get_model", name, version)
+        return self.resources["models"].get(f"{name}:{version}")
+
+    def register_model(self, name, version, path, description):
+        self._call("register_model", name, version)
+        key = f"{name}:{version}"
+        return self._provision("models", key, f"azureml:{key}")
+
+    def get_environment(self, name, version):
+        self._call("get_environment", name, version)
+        return self.resources["environments"].get(f"{name}:{version}")
+
+    def create_environment(self, name, version, image, conda_file, description):
+        self._call("create_environment", name, version)
+        key = f"{name}:{version}"
+        return self._provision("environments", key, f"azureml:{key}")
+
+    def get_endpoint(self, name):
+        self._call("get_endpoint", name)
+        return self.resources["endpoints"].get(name)
+
+    def create_endpoint(self, name, description, tags):
+        self._call("create_endpoint", name)
+        scoring_uri = f"https://{name}.fake.inference.ml.azure.com/score"
+        return self._provision("endpoints", name, scoring_uri)
+
+    def get_deployment(self, endpoint, name):
+        self._call("get_deployment", endpoint, name)
+        if f"{endpoint}/{name}" in self.resources["deployments"]:
+            return name
+        return None
+
+    def create_deployment(self, endpoint, name, **spec):
+        self._call("create_deployment", endpoint, name)
+        self._provision("deployments", f"{endpoint}/{name}", spec)
+        return name
+
+    def get_traffic(self, endpoint):
+        self._call("get_traffic", endpoint)
+        return dict(self.resources["traffic"].get(endpoint, {}))
+
+    def set_traffic(self, endpoint, traffic):
+        self._call("set_traffic", endpoint, traffic)
+        self._provision("traffic", endpoint, dict(traffic))
+
+    def endpoint_details(self, endpoint):
+        self._call("endpoint_details", endpoint)
+        scoring_uri = self.resources["endpoints"][endpoint]
+        return {"scoring_uri": scoring_uri, "primary_key": "fake-key"}
+
+
+class AzureBackend:
+    """Azure ML (azure-ai-ml) implementation of the backend calls."""
+
+    def __init__(self, subscription_id, resource_group, workspace):
+        from azure.identity import DefaultAzureCredential
+
+        self.subscription_id = subscription_id
+        self.resource_group = resource_group
+        self.workspace = workspace
+        self.credential = DefaultAzureCredential()
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from azure.ai.ml import MLClient
+
+                self._client = MLClient(
+                    credential=self.credential,
+                    subscription_id=self.subscription_id,
+                    resource_group_name=self.resource_group,
+                    workspace_name=self.workspace,
+                )
+            return self._client
+
+    @staticmethod
+    def _missing(e):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        return isinstance(e, ResourceNotFoundError)
+
+    def check_auth(self):
+        from azure.mgmt.resource import ResourceManagementClient
+
+        client = ResourceManagementClient(self.credential, self.subscription_id)
+        client.resource_groups.get(self.resource_group)
+
+    def workspace_name(self):
+        return self.client.workspaces.get(self.workspace).name
+
+    def get_model(self, name, version):
+        try:
+            return self.client.models.get(name=name, version=version).id
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def register_model(self, name, version, path, description):
+        from azure.ai.ml.entities import Model
+
+        model = Model(
+            path=path,
+            name=name,
+            version=version,
+            description=description,
+            type="custom_model",
+        )
+        return self.client.models.create_or_update(model).id
+
+    def get_environment(self, name, version):
+        try:
+            return self.client.environments.get(name=name, version=version).id
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def create_environment(self, name, version, image, conda_file, description):
+        from azure.ai.ml.entities import Environment
+
+        env = Environment(
+            name=name,
+            version=version,
+            image=image,
+            conda_file=conda_file,
+            description=description,
+        )
+        return self.client.environments.create_or_update(env).id
+
+    def get_endpoint(self, name):
+        try:
+            return self.client.online_endpoints.get(name).scoring_uri
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def create_endpoint(self, name, description, tags):
+        from azure.ai.ml.entities import ManagedOnlineEndpoint
+
+        endpoint = ManagedOnlineEndpoint(
+            name=name, description=description, auth_mode="key", tags=tags
+        )
+        return self.client.begin_create_or_update(endpoint).result().scoring_uri
+
+    def get_deployment(self, endpoint, name):
+        try:
+            return self.client.online_deployments.get(
+                name=name, endpoint_name=endpoint
+            ).name
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def create_deployment(self, endpoint, name, **spec):
+        from azure.ai.ml.entities import CodeConfiguration, ManagedOnlineDeployment
+
+        deployment = ManagedOnlineDeployment(
+            name=name,
+            endpoint_name=endpoint,
+            model=spec["model"],
+            environment=spec["environment"],
+            code_configuration=CodeConfiguration(
+                code=spec["code_path"], scoring_script=spec["scoring_script"]
+            ),
+            instance_type=spec["instance_type"],
+            instance_count=spec["instance_count"],
+        )
+        self.client.begin_create_or_update(deployment).result()
+        return name
+
+    def get_traffic(self, endpoint):
+        return dict(self.client.online_endpoints.get(endpoint).traffic or {})
+
+    def set_traffic(self, endpoint, traffic):
+        endpoint_obj = self.client.online_endpoints.get(endpoint)
+        endpoint_obj.traffic = traffic
+        self.client.begin_create_or_update(endpoint_obj).result()
+
+    def endpoint_details(self, endpoint):
+        endpoint_obj = self.client.online_endpoints.get(endpoint)
+        keys = self.client.online_endpoints.get_keys(endpoint)
+        return {
+            "scoring_uri": endpoint_obj.scoring_uri,
+            "primary_key": keys.primary_key,
+        }
+
+
+# Steps: each takes (backend, config, results) and returns a JSON-able dict
+
+
+def step_auth(backend, config, results):
+    backend.check_auth()
+    return {}
+
+
+def step_workspace(backend, config, results):
+    return {"workspace": backend.workspace_name()}
+
+
+def step_model(backend, config, results):
+    version = config["model_hash"][:12]
+    model_id = backend.get_model(MODEL_NAME, version)
+    if model_id:
+        return {"id": model_id, "version": version, "created": False}
+    model_id = backend.register_model(
+        MODEL_NAME,
+        version,
+        config["model_path"],
+        "Linear regression model for balance prediction",
     )
-    # Test the connection by getting workspace info
-    workspace_info = ml_client.workspaces.get()
-    print(f"✅ Connected to ML workspace: {workspace_info.name}")
-except Exception as e:
-    print(f"❌ ML Client connection failed: {e}")
-    print("Make sure your workspace exists and you have proper permissions")
-    exit(1)
-
-# ✅ Register the model
-try:
-    model = MLModel(
-        path="balance_model.pkl",
-        name="balance-predictor",
-        description="Linear regression model for balance prediction",
-        type="custom_model",
+    return {"id": model_id, "version": version, "created": True}
+
+
+def step_environment(backend, config, results):
+    version = config["environment_hash"][:12]
+    env_id = backend.get_environment(ENVIRONMENT_NAME, version)
+    if env_id:
+        return {"id": env_id, "version": version, "created": False}
+    env_id = backend.create_environment(
+        ENVIRONMENT_NAME,
+        version,
+        ENVIRONMENT_IMAGE,
+        config["conda_file"],
+        "Env for balance predictor",
     )
-    registered_model = ml_client.models.create_or_update(model)
-    print(f"✅ Model registered: {registered_model.name}")
-except Exception as e:
-    print(f"❌ Model registration failed: {e}")
-    exit(1)
-
-# ✅ Create a unique endpoint name
-unique_id = str(uuid.uuid4())[:8]
-endpoint_name = f"balance-predictor-{unique_id}"
-print(f"🆕 Creating new endpoint: {endpoint_name}")
-
-# ✅ Create a new endpoint with explicit configuration
-try:
-    endpoint = ManagedOnlineEndpoint(
-        name=endpoint_name,
-        description="Endpoint for predicting balances",
-        auth_mode="key",
-        # Add explicit tags to help with tracking
-        tags={"project": "balance-predictor", "environment": "test"}
+    return {"id": env_id, "version": version, "created": True}
+
+
+def step_endpoint(backend, config, results):
+    name = config["endpoint"]
+    scoring_uri = backend.get_endpoint(name)
+    if scoring_uri:
+        return {"name": name, "created": False}
+    backend.create_endpoint(
+        name,
+        "Endpoint for predicting balances",
+        {"project": "balance-predictor", "environment": config["stage"]},
     )
-    
-    print(f"🔄 Creating endpoint (this may take 5-10 minutes)...")
-    # Use create_or_update with explicit wait and timeout
-    poller = ml_client.begin_create_or_update(endpoint)
-    result = poller.result(timeout=600)  # 10 minute timeout
-    print(f"✅ Endpoint created: {result.name}")
-except Exception as e:
-    print(f"❌ Endpoint creation failed: {e}")
-    print("Full error details:", str(e))
-    exit(1)
-
-# ✅ Create an environment
-try:
-    env = Environment(
-        image="mcr.microsoft.com/azureml/minimal-ubuntu20.04-py38-cpu-inference:latest",
-        conda_file="predictive-model/environment.yml",
-        name="balance-env",
-        description="Env for balance predictor",
+    return {"name": name, "created": True}
+
+
+def deployment_name(config):
+    h = hashlib.sha256(
+        (
+            config["model_hash"] + config["environment_hash"] + config["code_hash"]
+        ).encode("ascii")
     )
-    print("✅ Environment defined")
-except Exception as e:
-    print(f"❌ Environment creation failed: {e}")
-    exit(1)
-
-# ✅ Create a deployment
-try:
-    deployment = ManagedOnlineDeployment(
-        name="blue",
-        endpoint_name=endpoint.name,
-        model=registered_model.id,
-        environment=env,
-        code_path="./predictive-model",  # folder with score.py
-        scoring_script="score.py",
-        instance_type="Standard_B1s",
-        instance_count=1
+    # deployment names: letters, digits and dashes, at most 32 characters
+    return f"d-{h.hexdigest()[:12]}"
+
+
+def step_deployment(backend, config, results):
+    endpoint = results["endpoint"]["name"]
+    name = deployment_name(config)
+    if backend.get_deployment(endpoint, name):
+        return {"name": name, "created": False}
+    backend.create_deployment(
+        endpoint,
+        name,
+        model=results["model"]["id"],
+        environment=results["environment"]["id"],
+        code_path=config["code_path"],
+        scoring_script=SCORING_SCRIPT,
+        instance_type=config["instance_type"],
+        instance_count=config["instance_count"],
     )
-    print("🔄 Creating deployment (this may take several minutes)...")
-    ml_client.begin_create_or_update(deployment).wait()
-    print("✅ Deployment created and ready")
-except Exception as e:
-    print(f"❌ Deployment creation failed: {e}")
-    exit(1)
-
-# ✅ Set traffic to the deployment
-try:
-    ml_client.online_endpoints.begin_update(
-        endpoint_name=endpoint.name,
-        traffic={"blue": 100}
-    ).wait()
-    print("✅ Traffic routed to deployment")
-except Exception as e:
-    print(f"❌ Traffic routing failed: {e}")
-    exit(1)
-
-# ✅ Get scoring URI and keys
-try:
-    endpoint = ml_client.online_endpoints.get(endpoint.name)
-    print("🔗 Scoring URI:", endpoint.scoring_uri)
-    
-    keys = ml_client.online_endpoints.list_keys(endpoint.name)
-    print("🔑 Primary Key:", keys.primary_key)
-    print("✅ Deployment completed successfully!")
-except Exception as e:
-    print(f"❌ Failed to get endpoint details: {e}")
\ No newline at end of file
+    return {"name": name, "created": True}
+
+
+def target_traffic(current, deployment, percent):
+    """New traffic map: ``percent`` to ``deployment``, the rest to the old live one."""
+    if percent >= 100:
+        return {deployment: 100}
+    others = {name: share for name, share in current.items() if name != deployment}
+    if not others:
+        return {deployment: 100}
+    previous = max(others, key=others.get)
+    return {deployment: percent, previous: 100 - percent}
+
+
+def step_traffic(backend, config, results):
+    endpoint = results["endpoint"]["name"]
+    deployment = results["deployment"]["name"]
+    current = {k: v for k, v in backend.get_traffic(endpoint).items() if v}
+    traffic = target_traffic(current, deployment, config["traffic"])
+    if traffic == current:
+        return {"traffic": traffic, "changed": False}
+    backend.set_traffic(endpoint, traffic)
+    return {"traffic": traffic, "changed": True}
+
+
+def step_details(backend, config, results):
+    return backend.endpoint_details(results["endpoint"]["name"])
+
+
+def build_plan():
+    return [
+        Step("auth", (), (), step_auth, False),
+        Step("workspace", ("auth",), (), step_workspace, False),
+        Step("model", ("workspace",), ("model_hash",), step_model, True),
+        Step(
+            "environment",
+            ("workspace",),
+            ("environment_hash",),
+            step_environment,
+            True,
+        ),
+        Step("endpoint", ("workspace",), ("endpoint", "stage"), step_endpoint, True),
+        Step(
+            "deployment",
+            ("model", "environment", "endpoint"),
+            ("code_hash", "instance_type", "instance_count"),
+            step_deployment,
+            True,
+        ),
+        # the requested split: this percentage for the deployment named in
+        # the dependency result
+        Step("traffic", ("deployment",), ("traffic",), step_traffic, True),
+        # keys are not written to the state file, so always fetch them
+        Step("details", ("traffic",), (), step_details, False),
+    ]
+
+
+class PlanExecutor:
+    """Run steps as soon as their dependencies finish, recording timings.
+
+    A cacheable step whose config and dependency results match the last
+    successful run in ``state_path`` is skipped and its recorded result
+    reused.
+    """
+
+    def __init__(self, steps, backend, config, state_path=None, max_workers=4):
+        self.steps = {step.name: step for step in steps}
+        self.backend = backend
+        self.config = config
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.state = self._load_state()
+        self.results = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+        for step in steps:
+            missing = [dep for dep in step.deps if dep not in self.steps]
+            if missing:
+                raise ValueError(f"{step.name} depends on unknown steps {missing}")
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _fingerprint(self, step):
+        payload = {
+            "inputs": {key: self.config[key] for key in step.inputs},
+            "deps": {dep: self.results[dep] for dep in step.deps},
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _run_step(self, step):
+        fingerprint = self._fingerprint(step)
+        recorded = self.state.get(step.name)
+        if step.cacheable and recorded and recorded["fingerprint"] == fingerprint:
+            return recorded["result"], 0.0, "cached"
+        start = time.perf_counter()
+        result = step.run(self.backend, self.config, self.results)
+        seconds = time.perf_counter() - start
+        if step.cacheable:
+            with self._lock:
+                self.state[step.name] = {
+                    "fingerprint": fingerprint,
+                    "result": result,
+                    "seconds": seconds,
+                }
+                self._save_state()
+        return result, seconds, "done"
+
+    def run(self, log=print):
+        pending = dict(self.steps)
+        running = {}
+        failure = None
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                if failure is None:
+                    ready = [
+                        step
+                        for step in pending.values()
+                        if all(dep in self.results for dep in step.deps)
+                    ]
+                    for step in ready:
+                        del pending[step.name]
+                        running[pool.submit(self._run_step, step)] = step
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        result, seconds, status = future.result()
+                    except Exception as e:
+                        failure = failure or DeployError(f"{step.name}: {e}")
+                        log(f"❌ {step.name} failed: {e}")
+                        continue
+                    self.results[step.name] = result
+                    self.timings[step.name] = (status, seconds)
+                    created = ""
+                    if status == "done" and result.get("created"):
+                        created = " (created)"
+                    log(f"✅ {step.name} {status} in {seconds:.2f}s{created}")
+        self.wall_seconds = time.perf_counter() - start
+        if failure is not None:
+            skipped = sorted(pending)
+            if skipped:
+                log(f"⏭  not started: {', '.join(skipped)}")
+            raise failure
+        return self.results
+
+
+def stage_model(files, staging_root):
+    """Copy model artifacts into the folder layout score.py looks for.
+
+    The model is uploaded as ``MODEL_FOLDER/`` holding balance_model.npz
+    and/or balance_model.pkl whatever the source file names, so it lands
+    at AZUREML_MODEL_DIR/balance_model/ on the endpoint.
+    """
+    folder = os.path.join(staging_root, MODEL_FOLDER)
+    os.makedirs(folder)
+    for path in files:
+        name = os.path.basename(path)
+        extension = os.path.splitext(name)[1]
+        if extension in MODEL_EXTENSIONS:
+            name = "balance_model" + extension
+        shutil.copy2(path, os.path.join(folder, name))
+    return folder
+
+
+def model_artifact(args, staging_root):
+    """(folder to upload, content hash) for --model or the registry's current version."""
+    if args.registry:
+        from model_registry import ModelRegistry
+
+        registry = ModelRegistry(args.registry)
+        version = registry.current()
+        if version is None:
+            raise DeployError(f"{args.registry} has no current model version")
+        files = [
+            os.path.join(registry.version_dir(version), name)
+            for name in registry.metadata(version)["files"]
+        ]
+    else:
+        files = [args.model]
+    folder = stage_model(files, staging_root)
+    return folder, tree_digest(folder)
+
+
+def check_sources(args):
+    """Fail early on a --code-path or --conda-file that is not there."""
+    if not os.path.isfile(os.path.join(args.code_path, SCORING_SCRIPT)):
+        raise DeployError(
+            f"--code-path {args.code_path} has no {SCORING_SCRIPT} to deploy"
+        )
+    if not os.path.isfile(args.conda_file):
+        raise DeployError(f"--conda-file {args.conda_file} does not exist")
+
+
+def make_backend(args):
+    if args.backend == "fake":
+        return FakeBackend(args.fake_latency, args.fake_fail, args.fake_store)
+    with open(args.config) as f:
+        workspace = json.load(f)
+    return AzureBackend(
+        workspace["subscription_id"],
+        workspace["resource_group"],
+        workspace["workspace_name"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.json", help="Azure ML workspace")
+    parser.add_argument("--model", default="balance_model.pkl")
+    parser.add_argument(
+        "--registry", help="Deploy the current version of this registry"
+    )
+    parser.add_argument("--code-path", default="./predictive-model")
+    parser.add_argument("--conda-file", default="predictive-model/environment.yml")
+    parser.add_argument("--endpoint", default=ENDPOINT_NAME)
+    parser.add_argument("--stage", default="test")
+    parser.add_argument("--instance-type", default="Standard_B1s")
+    parser.add_argument("--instance-count", type=int, default=1)
+    parser.add_argument(
+        "--traffic",
+        type=int,
+        default=100,
+        help="Percent of traffic for the new deployment; the rest stays live",
+    )
+    parser.add_argument("--state", default=".deploy_state.json")
+    parser.add_argument("--fresh", action="store_true", help="Ignore --state")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--backend", choices=["azure", "fake"], default="azure")
+    parser.add_argument("--fake-latency", type=float, default=0.0)
+    parser.add_argument("--fake-fail", help="Backend method that fails (fake only)")
+    parser.add_argument("--fake-store", default=".deploy_fake_cloud.json")
+    args = parser.parse_args()
+
+    if not 0 < args.traffic <= 100:
+        parser.error("--traffic must be between 1 and 100")
+    if args.fresh and os.path.exists(args.state):
+        os.remove(args.state)
+
+    staging_root = tempfile.mkdtemp(prefix="deploy-")
+    try:
+        check_sources(args)
+        model_path, model_hash = model_artifact(args, staging_root)
+        config = {
+            "model_path": model_path,
+            "model_hash": model_hash,
+            "conda_file": args.conda_file,
+            "environment_hash": tree_digest(args.conda_file),
+            "code_path": args.code_path,
+            "code_hash": tree_digest(args.code_path),
+            "endpoint": args.endpoint,
+            "stage": args.stage,
+            "instance_type": args.instance_type,
+            "instance_count": args.instance_count,
+            "traffic": args.traffic,
+        }
+        executor = PlanExecutor(
+            build_plan(), make_backend(args), config, args.state, args.workers
+        )
+        results = executor.run()
+    except (DeployError, ImportError, OSError) as e:
+        print(f"❌ Deployment failed: {e}")
+        return 1
+    finally:
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+    print(f"🔗 Scoring URI: {results['details']['scoring_uri']}")
+    print(f"🔑 Primary Key: {results['details']['primary_key']}")
+    print(f"🚦 Traffic: {results['traffic']['traffic']}")
+    total = sum(seconds for _, seconds in executor.timings.values())
+    print(
+        f"✅ Deployment completed in {executor.wall_seconds:.2f}s "
+        f"({total:.2f}s of step time)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""Streaming drift monitor for the scoring path.
+
+The training pipeline writes a reference next to the model: quantile bin
+edges and counts for the journal features and for the model's own
+predictions on the training rows, plus the hold-out MAE.
+``DriftMonitor.observe`` runs inline on every scoring request and adds the
+request's rows to the same bins in the current time window. Windows form a
+fixed ring (``n_windows`` x ``window_seconds``), so memory does not grow
+with traffic: the live distribution is the sum of the ring.
+
+Predictions are kept per request id (at most ``max_pending``) until
+``record_actuals`` brings the observed balances, which feed a rolling MAE
+over the same ring. Every ``check_interval`` seconds the window is compared
+with the reference (PSI and binned KS per feature, MAE against the
+training MAE) on a background thread, so no scoring request waits for it;
+when a threshold is crossed ``on_drift`` is called with the report, at
+most once per ``cooldown`` seconds.
+
+Configured from the environment by ``monitor_from_env``: DRIFT_REFERENCE,
+DRIFT_WINDOW_SECONDS, DRIFT_WINDOWS, DRIFT_MIN_ROWS, DRIFT_PSI_THRESHOLD,
+DRIFT_KS_THRESHOLD, DRIFT_MAE_RATIO, DRIFT_COOLDOWN and
+DRIFT_RETRAIN_COMMAND (run without waiting when drift is detected).
+
+    python drift_monitor.py balance_model_drift.json --rows 1 --requests 100000
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from compiled_model import FEATURE_COLUMNS
+
+MONITORED_FEATURES = ["JOURNAL_COUNT", "JOURNAL_TOTAL_AMOUNT", "JOURNAL_AVG_AMOUNT"]
+PREDICTION = "PREDICTION"
+# floor for empty bins so PSI stays finite
+MIN_SHARE = 1e-4
+
+
+def _histogram(values, n_bins):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+    edges = np.unique(quantiles)
+    counts = np.bincount(np.searchsorted(edges, values, side="right"))
+    return {
+        "edges": edges.tolist(),
+        "counts": np.pad(counts, (0, len(edges) + 1 - len(counts))).tolist(),
+    }
+
+
+def build_reference(frame, predictions=None, mae=None, n_bins=10):
+    """Reference bins for MONITORED_FEATURES (and predictions) of ``frame``."""
+    reference = {
+        "version": 1,
+        "rows": int(len(frame)),
+        "mae": mae,
+        "features": {},
+    }
+    for name in MONITORED_FEATURES:
+        reference["features"][name] = dict(
+            _histogram(frame[name], n_bins), column=FEATURE_COLUMNS.index(name)
+        )
+    if predictions is not None:
+        reference["features"][PREDICTION] = _histogram(predictions, n_bins)
+    return reference
+
+
+def save_reference(reference, path):
+    with open(path, "w") as f:
+        json.dump(reference, f, indent=2)
+    return path
+
+
+def load_reference(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors."""
+    e = np.maximum(expected / max(expected.sum(), 1), MIN_SHARE)
+    a = np.maximum(actual / max(actual.sum(), 1), MIN_SHARE)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def binned_ks(expected, actual):
+    """Largest CDF gap between two count vectors over the same bins."""
+    e = np.cumsum(expected) / max(expected.sum(), 1)
+    a = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(a - e)))
+
+
+class DriftMonitor:
+    """Windowed feature, prediction and error sketches against a reference."""
+
+    def __init__(
+        self,
+        reference,
+        window_seconds=300,
+        n_windows=12,
+        min_rows=200,
+        min_actuals=50,
+        psi_threshold=0.2,
+        ks_threshold=0.15,
+        mae_ratio=1.5,
+        check_interval=10.0,
+        cooldown=6 * 3600,
+        max_pending=10_000,
+        on_drift=None,
+        clock=time.monotonic,
+    ):
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.n_windows = n_windows
+        self.min_rows = min_rows
+        self.min_actuals = min_actuals
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.mae_ratio = mae_ratio
+        self.check_interval = check_interval
+        self.cooldown = cooldown
+        self.max_pending = max_pending
+        self.on_drift = on_drift
+        self.clock = clock
+
+        # every feature's bins live side by side in one flat count vector,
+        # input columns first and the prediction last
+        features = reference["features"]
+        self.names = sorted(features, key=lambda name: "column" not in features[name])
+        self._columns = np.asarray(
+            [
+                features[name]["column"]
+                for name in self.names
+                if "column" in features[name]
+            ],
+            dtype=np.int64,
+        )
+        self._with_prediction = PREDICTION in features
+        self._edges = [np.asarray(features[name]["edges"]) for name in self.names]
+        sizes = [len(edges) + 1 for edges in self._edges]
+        self._offsets = np.cumsum([0] + sizes[:-1])
+        self._n_bins = sum(sizes)
+        # edges padded with +inf so one broadcast comparison bins every feature
+        self._edge_matrix = np.full((len(self.names), max(sizes) - 1), np.inf)
+        for i, edges in enumerate(self._edges):
+            self._edge_matrix[i, : len(edges)] = edges
+        self._reference_counts = np.concatenate(
+            [
+                np.asarray(reference["features"][name]["counts"], dtype=np.float64)
+                for name in self.names
+            ]
+        )
+
+        self._epochs = np.full(n_windows, -1, dtype=np.int64)
+        self._counts = np.zeros((n_windows, self._n_bins), dtype=np.int64)
+        self._rows = np.zeros(n_windows, dtype=np.int64)
+        self._abs_error = np.zeros(n_windows, dtype=np.float64)
+        self._actuals = np.zeros(n_windows, dtype=np.int64)
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._last_trigger = None
+        self.counters = {
+            "requests": 0,
+            "evicted": 0,
+            "unmatched": 0,
+            "triggers": 0,
+            "check_errors": 0,
+        }
+        self.last_report = None
+        self._checking = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="drift-check"
+        )
+
+    def _slot(self, now):
+        """Ring index for ``now``, clearing it when a new window starts."""
+        epoch = int(now // self.window_seconds)
+        slot = epoch % self.n_windows
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+            self._rows[slot] = 0
+            self._abs_error[slot] = 0.0
+            self._actuals[slot] = 0
+        return slot
+
+    def _live(self, now):
+        return self._epochs > int(now // self.window_seconds) - self.n_windows
+
+    def observe(self, X, predictions, request_id=None):
+        """Add one scored request; cheap enough to call on every request."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        predictions = np.asarray(predictions, dtype=np.float64).ravel()
+        values = X.take(self._columns, axis=1)
+        if self._with_prediction:
+            values = np.concatenate((values, predictions[:, None]), axis=1)
+        bins = (values[:, :, None] >= self._edge_matrix).sum(axis=2) + self._offsets
+        counts = np.bincount(bins.ravel(), minlength=self._n_bins)
+
+        now = self.clock()
+        with self._lock:
+            slot = self._slot(now)
+            self._counts[slot] += counts
+            self._rows[slot] += len(X)
+            self.counters["requests"] += 1
+            if request_id:
+                self._pending[request_id] = predictions
+                if len(self._pending) > self.max_pending:
+                    self._pending.popitem(last=False)
+                    self.counters["evicted"] += 1
+            check = now >= self._next_check
+            if check:
+                self._next_check = now + self.check_interval
+        if check:
+            self._schedule_check()
+
+    def _schedule_check(self):
+        # the request that crosses the interval only queues the check; it
+        # runs on the monitor's own thread, one at a time
+        with self._lock:
+            if self._checking:
+                return
+            self._checking = True
+        self._executor.submit(self._background_check)
+
+    def _background_check(self):
+        try:
+            self.check()
+        except Exception:
+            with self._lock:
+                self.counters["check_errors"] += 1
+        finally:
+            with self._lock:
+                self._checking = False
+
+    def record_actuals(self, request_id, actuals):
+        """Join observed balances to a scored request; returns rows matched."""
+        actuals = np.asarray(actuals, dtype=np.float64).ravel()
+        with self._lock:
+            predictions = self._pending.pop(request_id, None)
+            if predictions is None or len(predictions) != len(actuals):
+                self.counters["unmatched"] += 1
+                return 0
+            slot = self._slot(self.clock())
+            self._abs_error[slot] += float(np.abs(predictions - actuals).sum())
+            self._actuals[slot] += len(actuals)
+        return len(actuals)
+
+    def report(self):
+        """Drift statistics for the live window against the reference."""
+        now = self.clock()
+        with self._lock:
+            live = self._live(now)
+            counts = self._counts[live].sum(axis=0)
+            rows = int(self._rows[live].sum())
+            abs_error = float(self._abs_error[live].sum())
+            n_actuals = int(self._actuals[live].sum())
+
+        report = {"rows": rows, "actuals": n_actuals, "features": {}, "alerts": []}
+        for name, offset, edges in zip(self.names, self._offsets, self._edges):
+            stop = offset + len(edges) + 1
+            expected = self._reference_counts[offset:stop]
+            actual = counts[offset:stop]
+            stats = {"psi": psi(expected, actual), "ks": binned_ks(expected, actual)}
+            report["features"][name] = stats
+            if rows >= self.min_rows:
+                if stats["psi"] > self.psi_threshold:
+                    report["alerts"].append(f"{name} psi {stats['psi']:.3f}")
+                if stats["ks"] > self.ks_threshold:
+                    report["alerts"].append(f"{name} ks {stats['ks']:.3f}")
+
+        report["mae"] = abs_error / n_actuals if n_actuals else None
+        reference_mae = self.reference.get("mae")
+        if (
+            report["mae"] is not None
+            and reference_mae
+            and n_actuals >= self.min_actuals
+            and report["mae"] > self.mae_ratio * reference_mae
+        ):
+            report["alerts"].append(
+                f"mae {report['mae']:.2f} vs {reference_mae:.2f} at training"
+            )
+        return report
+
+    def check(self):
+        """Compute the report and call ``on_drift`` if it has alerts."""
+        report = self.report()
+        now = self.clock()
+        with self._lock:
+            self.last_report = report
+            trigger = bool(report["alerts"]) and (
+                self._last_trigger is None or now - self._last_trigger >= self.cooldown
+            )
+            if trigger:
+                self._last_trigger = now
+                self.counters["triggers"] += 1
+        if trigger and self.on_drift is not None:
+            self.on_drift(report)
+        return report
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            counters["pending"] = len(self._pending)
+            report = self.last_report
+        return {"counters": counters, "last_report": report}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def retrain_command(command):
+    """``on_drift`` callback that starts ``command``, one run at a time.
+
+    A trigger while the previous run is still going is skipped, not queued.
+    """
+    args = shlex.split(command)
+    lock = threading.Lock()
+    running = []
+
+    def on_drift(report):
+        with lock:
+            if running and running[0].poll() is None:
+                print(f"Drift detected, {command} is still running; skipped")
+                return
+            print(f"Drift detected ({'; '.join(report['alerts'])}), running {command}")
+            running[:] = [subprocess.Popen(args)]
+
+    return on_drift
+
+
+def monitor_from_env():
+    """Build a DriftMonitor from the environment, or None without DRIFT_REFERENCE."""
+    path = os.getenv("DRIFT_REFERENCE")
+    if not path:
+        return None
+    command = os.getenv("DRIFT_RETRAIN_COMMAND")
+    return DriftMonitor(
+        load_reference(path),
+        window_seconds=float(os.getenv("DRIFT_WINDOW_SECONDS", "300")),
+        n_windows=int(os.getenv("DRIFT_WINDOWS", "12")),
+        min_rows=int(os.getenv("DRIFT_MIN_ROWS", "200")),
+        psi_threshold=float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2")),
+        ks_threshold=float(os.getenv("DRIFT_KS_THRESHOLD", "0.15")),
+        mae_ratio=float(os.getenv("DRIFT_MAE_RATIO", "1.5")),
+        cooldown=float(os.getenv("DRIFT_COOLDOWN", str(6 * 3600))),
+        on_drift=retrain_command(command) if command else None,
+    )
+
+
+def _sample(spec, n, rng):
+    edges = np.asarray(spec["edges"])
+    if len(edges) == 0:
+        return np.zeros(n)
+    counts = np.asarray(spec["counts"], dtype=np.float64)
+    # the open outer bins get a finite width of a tenth of the inner range
+    pad = max(edges[-1] - edges[0], 1.0) / 10
+    bounds = np.concatenate([edges[:1] - pad, edges, edges[-1:] + pad])
+    bins = rng.choice(len(counts), size=n, p=counts / counts.sum())
+    return rng.uniform(bounds[bins], bounds[bins + 1])
+
+
+def sample_requests(reference, n, rng, shift=0.0):
+    """(X, predictions) drawn from the reference bins, scaled by 1 + shift."""
+    X = np.zeros((n, len(FEATURE_COLUMNS)))
+    for name in MONITORED_FEATURES:
+        spec = reference["features"][name]
+        X[:, spec["column"]] = _sample(spec, n, rng)
+    predictions = np.zeros(n)
+    if PREDICTION in reference["features"]:
+        predictions = _sample(reference["features"][PREDICTION], n, rng)
+    return X * (1.0 + shift), predictions * (1.0 + shift)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time DriftMonitor.observe")
+    parser.add_argument("reference")
+    parser.add_argument("--rows", type=int, default=1, help="Rows per request")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--shift", type=float, default=0.0, help="Scale features")
+    args = parser.parse_args()
+
+    reference = load_reference(args.reference)
+    rng = np.random.default_rng(0)
+    X, predictions = sample_requests(reference, args.rows * 1000, rng, args.shift)
+    monitor = DriftMonitor(reference, check_interval=1.0)
+
+    start = time.perf_counter()
+    for i in range(args.requests):
+        j = (i % 1000) * args.rows
+        rows = slice(j, j + args.rows)
+        monitor.observe(X[rows], predictions[rows], f"req-{i}")
+        if i % 10 == 0:
+            monitor.record_actuals(f"req-{i}", predictions[rows] * 1.01)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.requests:,} requests x {args.rows} rows: "
+        f"{elapsed / args.requests * 1e6:.1f}us per observe"
+    )
+    print(json.dumps(monitor.check(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+DATE_LIKE = re.compile(r"\d[-/.:]\d|\d{1,2}[ -][A-Za-z]{3}")
+# tried in order; a column converts only if one format parses every sampled
+# value, so fractions ("3/4") and clock times ("10:30") stay strings
+DATE_FORMATS = (
+    "ISO8601",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d %b %Y",
+    "%d-%b-%Y",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%Y %H:%M",
+)
+YEAR_RANGE = (1900, 2100)
+
+
+def _to_datetime(series, date_format):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pd.to_datetime(series, format=date_format, errors="coerce")
+
+
+def _sniff_date_format(series, sample_size=200):
+    """The DATE_FORMATS entry every sampled value parses with, or None."""
+    sample = series.dropna().head(sample_size)
+    if sample.empty or not all(isinstance(v, str) for v in sample):
+        return None
+    if not sample.str.contains(DATE_LIKE).all():
+        return None
+    for date_format in DATE_FORMATS:
+        parsed = _to_datetime(sample, date_format)
+        if parsed.notna().all() and parsed.dt.year.between(*YEAR_RANGE).all():
+            return date_format
+    return None
+
+
+def _parse_dates(series, date_format):
+    parsed = _to_datetime(series, date_format)
+    # Keep the original if any non-missing value failed to parse
+    if parsed.isna().sum() > series.isna().sum():
+        return None
+    if not parsed.dropna().dt.year.between(*YEAR_RANGE).all():
+        return None
+    return parsed
+
+
+def _downcast_float(series):
+    downcast = series.astype(np.float32)
+    if np.array_equal(
+        downcast.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True
+    ):
+        return downcast
+    return None
+
+
+def optimize_dtypes(
+    data,
+    category_ratio=0.5,
+    max_categories=10000,
+    parse_dates=True,
+    downcast_floats=False,
+):
+    """Shrink a DataFrame's memory footprint in place and report the savings.
+
+    - integer columns are downcast to the smallest signed type that fits
+    - object columns whose values all parse with one of DATE_FORMATS, with
+      years in YEAR_RANGE, become datetime64
+    - object columns with few distinct values become ``category``
+    - float columns become float32 only when ``downcast_floats`` is set and
+      no value changes; pandas then also accumulates their stats in float32
+
+    Returns the report dict added to the summary under ``"memory"``.
+    """
+    before = int(data.memory_usage(deep=True).sum())
+    converted = {}
+    for col in data.columns:
+        series = data[col]
+        old_dtype = str(series.dtype)
+        new = None
+        if pd.api.types.is_integer_dtype(series.dtype) and not isinstance(
+            series.dtype, pd.api.extensions.ExtensionDtype
+        ):
+            new = pd.to_numeric(series, downcast="integer")
+        elif downcast_floats and series.dtype == np.float64:
+            new = _downcast_float(series)
+        elif pd.api.types.is_object_dtype(series.dtype) or (
+            pd.api.types.is_string_dtype(series.dtype)
+            and not isinstance(series.dtype, pd.CategoricalDtype)
+        ):
+            date_format = _sniff_date_format(series) if parse_dates else None
+            if date_format is not None:
+                new = _parse_dates(series, date_format)
+            if new is None:
+                n_unique = series.nunique()
+                if n_unique <= max_categories and n_unique <= category_ratio * len(
+                    series
+                ):
+                    new = series.astype("category")
+        if new is not None and str(new.dtype) != old_dtype:
+            data[col] = new
+            converted[col] = f"{old_dtype} -> {new.dtype}"
+    after = int(data.memory_usage(deep=True).sum())
+    return {
+        "before_bytes": before,
+        "after_bytes": after,
+        "saved_bytes": before - after,
+        "saved_pct": (before - after) / before * 100 if before else 0.0,
+        "converted_columns": converted,
+    }
@@ -0,0 +1,203 @@
+"""Partitioned Parquet store of daily per-book journal aggregates.
+
+Each row is one (DATE, SAP_BOOK_ID) with the sum and count of VALUE; the
+mean is derived on read so partial aggregates stay mergeable. Rows are
+partitioned by month (``month=YYYY-MM/part.parquet``) and ``_manifest.json``
+records the partitions and the ingestion watermark, the last journal date
+already stored. ``update`` only ingests dates after the watermark, so a
+daily run appends one day instead of re-aggregating the whole history.
+
+    python feature_store.py features/journal_agg
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+KEY_COLUMNS = ["DATE", "SAP_BOOK_ID"]
+SUM_COLUMNS = ["JOURNAL_TOTAL_AMOUNT", "JOURNAL_COUNT"]
+
+
+def add_average(agg):
+    """Add JOURNAL_AVG_AMOUNT from the stored sum and count."""
+    agg["JOURNAL_AVG_AMOUNT"] = agg["JOURNAL_TOTAL_AMOUNT"] / agg[
+        "JOURNAL_COUNT"
+    ].where(agg["JOURNAL_COUNT"] > 0)
+    return agg
+
+
+def _write_atomic(path, write):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class JournalFeatureStore:
+    """Month-partitioned Parquet store of journal sums and counts."""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest = self._load_manifest()
+
+    @staticmethod
+    def exists(root):
+        return os.path.exists(os.path.join(root, MANIFEST_NAME))
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME), "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"version": MANIFEST_VERSION, "watermark": None, "partitions": {}}
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(
+                f"{self.root}: unsupported feature store version "
+                f"{manifest.get('version')}"
+            )
+        return manifest
+
+    def _save_manifest(self):
+        def write(path):
+            with open(path, "w") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+        _write_atomic(os.path.join(self.root, MANIFEST_NAME), write)
+
+    @property
+    def watermark(self):
+        watermark = self.manifest["watermark"]
+        return pd.Timestamp(watermark) if watermark else None
+
+    def _partition_path(self, month):
+        return os.path.join(self.root, f"month={month}", "part.parquet")
+
+    def _read_partition(self, month, columns=None, filters=None):
+        table = pq.read_table(
+            self._partition_path(month), columns=columns, filters=filters
+        )
+        return table.to_pandas()
+
+    def update(self, partials):
+        """Ingest partial aggregates for dates after the watermark.
+
+        ``partials`` is an iterable of frames with DATE, SAP_BOOK_ID,
+        JOURNAL_TOTAL_AMOUNT and JOURNAL_COUNT (as columns or index), such
+        as ``training_pipeline.partial_journal_agg`` output. Returns counts
+        of new rows, skipped rows and rewritten partitions.
+        """
+        watermark = self.watermark
+        fresh = []
+        skipped = 0
+        for partial in partials:
+            if isinstance(partial.index, pd.MultiIndex):
+                partial = partial.reset_index()
+            partial = partial[KEY_COLUMNS + SUM_COLUMNS]
+            if watermark is not None:
+                new = partial["DATE"] > watermark
+                skipped += int((~new).sum())
+                partial = partial[new]
+            if len(partial):
+                fresh.append(partial)
+        if not fresh:
+            return {"rows": 0, "skipped": skipped, "partitions": []}
+
+        new_agg = pd.concat(fresh).groupby(KEY_COLUMNS, as_index=False).sum()
+        new_agg["JOURNAL_COUNT"] = new_agg["JOURNAL_COUNT"].astype(np.int64)
+        months = new_agg["DATE"].dt.strftime("%Y-%m")
+        written = []
+        for month, rows in new_agg.groupby(months, sort=True):
+            if month in self.manifest["partitions"]:
+                # keys already stored were written by an update that crashed
+                # before saving the manifest; the new aggregates replace them
+                rows = pd.concat([self._read_partition(month), rows])
+                rows = rows.drop_duplicates(KEY_COLUMNS, keep="last")
+            rows = rows.sort_values(KEY_COLUMNS, ignore_index=True)
+            table = pa.Table.from_pandas(rows, preserve_index=False)
+            _write_atomic(
+                self._partition_path(month),
+                lambda path, table=table: pq.write_table(table, path),
+            )
+            self.manifest["partitions"][month] = {
+                "rows": len(rows),
+                "max_date": rows["DATE"].max().date().isoformat(),
+            }
+            written.append(month)
+
+        self.manifest["watermark"] = new_agg["DATE"].max().date().isoformat()
+        # partitions first, manifest last: a crash leaves the old watermark,
+        # and the retry replaces the rows it wrote rather than adding to them
+        self._save_manifest()
+        return {"rows": len(new_agg), "skipped": skipped, "partitions": written}
+
+    def _months(self, start=None, end=None):
+        months = sorted(self.manifest["partitions"])
+        if start is not None:
+            months = [m for m in months if m >= pd.Timestamp(start).strftime("%Y-%m")]
+        if end is not None:
+            months = [m for m in months if m <= pd.Timestamp(end).strftime("%Y-%m")]
+        return months
+
+    def iter_frames(self, start=None, end=None, books=None):
+        """Yield one frame per month partition in the training layout."""
+        filters = []
+        if start is not None:
+            filters.append(("DATE", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("DATE", "<=", pd.Timestamp(end)))
+        if books is not None:
+            filters.append(("SAP_BOOK_ID", "in", list(books)))
+        for month in self._months(start, end):
+            frame = self._read_partition(month, filters=filters or None)
+            if len(frame):
+                yield add_average(frame)
+
+    def read(self, start=None, end=None, books=None):
+        """Return the aggregates as the notebook's ``journal_agg`` frame."""
+        frames = list(self.iter_frames(start, end, books))
+        if not frames:
+            return add_average(
+                pd.DataFrame(
+                    {
+                        "DATE": pd.Series(dtype="datetime64[ns]"),
+                        "SAP_BOOK_ID": pd.Series(dtype=object),
+                        "JOURNAL_TOTAL_AMOUNT": pd.Series(dtype=np.float64),
+                        "JOURNAL_COUNT": pd.Series(dtype=np.int64),
+                    }
+                )
+            )
+        return pd.concat(frames, ignore_index=True)
+
+    def info(self):
+        partitions = self.manifest["partitions"]
+        return {
+            "root": self.root,
+            "watermark": self.manifest["watermark"],
+            "partitions": len(partitions),
+            "rows": sum(p["rows"] for p in partitions.values()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="Feature store directory")
+    args = parser.parse_args()
+    print(json.dumps(JournalFeatureStore(args.root).info(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
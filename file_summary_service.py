@@ -1,14 +1,93 @@
 import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
+from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from textblob import TextBlob
+import hashlib
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from dtype_optimizer import optimize_dtypes
+from summary_cache import json_default, to_json_types
+from summary_state import SummaryState
+
+
+def excel_engine():
+    """Return the fastest available pandas Excel engine.
+
+    calamine (Rust, via python-calamine) is several times faster than
+    openpyxl and does not build a cell object per value; it needs
+    pandas >= 2.2.
+    """
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return "openpyxl"
+    major, minor = (int(part) for part in pd.__version__.split(".")[:2])
+    if (major, minor) < (2, 2):
+        return "openpyxl"
+    return "calamine"
+
+
+def read_excel_sheet(file_path, sheet_name=0, usecols=None, nrows=None, engine=None):
+    """Read one worksheet, optionally limited to some columns and rows."""
+    return pd.read_excel(
+        file_path,
+        sheet_name=sheet_name,
+        usecols=usecols,
+        nrows=nrows,
+        engine=engine or excel_engine(),
+    )
+
+
+def read_excel_sheets(
+    file_path, sheet_names=None, usecols=None, nrows=None, max_workers=None
+):
+    """Read several worksheets concurrently, one worker process per sheet.
+
+    Processes rather than threads are used because openpyxl parsing is pure
+    Python and would serialize on the GIL.
+    """
+    engine = excel_engine()
+    if sheet_names is None:
+        with pd.ExcelFile(file_path, engine=engine) as workbook:
+            sheet_names = workbook.sheet_names
+    if len(sheet_names) == 1:
+        name = sheet_names[0]
+        return {name: read_excel_sheet(file_path, name, usecols, nrows, engine)}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(
+                read_excel_sheet, file_path, name, usecols, nrows, engine
+            )
+            for name in sheet_names
+        }
+        return {name: future.result() for name, future in futures.items()}
 
 
 class FileSummaryService:
-    def __init__(self, file_path):
+    def __init__(
+        self,
+        file_path,
+        cache=None,
+        sheet_name=0,
+        usecols=None,
+        nrows=None,
+        optimize_memory=True,
+        progress=None,
+    ):
         self.file_path = file_path
+        self.cache = cache  # optional SummaryCache
+        # usecols/nrows give a quick preview summary of a large file
+        self.sheet_name = sheet_name
+        self.usecols = usecols
+        self.nrows = nrows
+        self.optimize_memory = optimize_memory
+        self.memory_report = None
+        # optional callable receiving a dict per completed step
+        self.progress = progress
         self.data = None
         self.summary = {}
 
@@ -17,13 +96,23 @@ class FileSummaryService:
         try:
             file_ext = os.path.splitext(self.file_path)[1].lower()
             if file_ext == ".csv":
-                self.data = pd.read_csv(self.file_path)
+                self.data = pd.read_csv(
+                    self.file_path, usecols=self.usecols, nrows=self.nrows
+                )
             elif file_ext == ".xlsx":
-                self.data = pd.read_excel(self.file_path)
+                self.data = read_excel_sheet(
+                    self.file_path, self.sheet_name, self.usecols, self.nrows
+                )
             else:
                 raise ValueError("Unsupported file format. Use CSV or XLSX.")
         except Exception as e:
             raise Exception(f"Error loading file: {str(e)}")
+        if self.optimize_memory:
+            self.memory_report = optimize_dtypes(self.data)
+
+    def _report(self, step, **details):
+        if self.progress is not None:
+            self.progress({"step": step, **details})
 
     def analyze_numerical_column(self, column):
         """Analyze a numerical column and return stats."""
@@ -56,10 +145,11 @@ class FileSummaryService:
             "missing": self.data[column].isna().mean() * 100,
         }
         # Basic NLP for text columns (if string length suggests text)
-        if (
-            self.data[column].dtype == "object"
-            and self.data[column].str.len().mean() > 10
-        ):
+        dtype = self.data[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtype = dtype.categories.dtype
+        is_text = pd.api.types.is_string_dtype(dtype)
+        if is_text and self.data[column].str.len().mean() > 10:
             try:
                 text = " ".join(self.data[column].dropna().astype(str))
                 blob = TextBlob(text)
@@ -92,14 +182,59 @@ class FileSummaryService:
         except:
             return "Error performing clustering"
 
-    def generate_summary(self, n_clusters=3):
-        """Generate a summary of the file."""
+    def detect_anomalies(self, numerical_columns, contamination=0.1):
+        """Detect anomalies in numerical data using Isolation Forest."""
+        try:
+            if not numerical_columns:
+                return None
+            X = self.data[numerical_columns].dropna()
+            if len(X) < 2:
+                return "Not enough data for anomaly detection"
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
+            iso_forest = IsolationForest(contamination=contamination, random_state=42)
+            predictions = iso_forest.fit_predict(X_scaled)
+            # Anomalies are labeled -1, normal points are 1
+            anomaly_indices = X.index[predictions == -1].tolist()
+            return {
+                "anomaly_count": len(anomaly_indices),
+                "anomaly_indices": anomaly_indices,
+            }
+        except:
+            return "Error performing anomaly detection"
+
+    def generate_summary(self, n_clusters=3, contamination=0.1):
+        """Generate a summary of the file.
+
+        When a cache is configured, a summary computed earlier for the same
+        file contents and parameters is returned without loading the file.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                self.file_path,
+                n_clusters=n_clusters,
+                contamination=contamination,
+                sheet_name=self.sheet_name,
+                usecols=self.usecols,
+                nrows=self.nrows,
+                optimize_memory=self.optimize_memory,
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.summary = cached
+                self._report("cached")
+                return self.summary
+
         if self.data is None:
             self.load_file()
+            self._report("loaded", rows=len(self.data))
 
         self.summary["file_name"] = os.path.basename(self.file_path)
         self.summary["rows"] = len(self.data)
         self.summary["columns"] = len(self.data.columns)
+        if self.memory_report is not None:
+            self.summary["memory"] = self.memory_report
         self.summary["column_details"] = {}
 
         # Analyze each column
@@ -110,19 +245,131 @@ class FileSummaryService:
             include=["object", "category"]
         ).columns.tolist()
 
-        for col in self.data.columns:
+        total = len(self.data.columns)
+        for i, col in enumerate(self.data.columns, start=1):
             if col in numerical_columns:
                 self.summary["column_details"][col] = self.analyze_numerical_column(col)
             else:
                 self.summary["column_details"][col] = self.analyze_categorical_column(
                     col
                 )
+            self._report("column", column=col, done=i, total=total)
 
-        # Apply clustering on numerical data
+        # Apply clustering and anomaly detection on numerical data
         self.summary["clustering"] = self.apply_clustering(
             numerical_columns, n_clusters
         )
+        self._report("clustering")
+        self.summary["anomalies"] = self.detect_anomalies(
+            numerical_columns, contamination
+        )
+        self._report("anomalies")
+
+        # the same shape a cache hit returns, whether or not a cache is set
+        self.summary = to_json_types(self.summary)
+        if cache_key is not None:
+            self.cache.put(cache_key, self.summary)
+
+        return self.summary
+
+    def generate_sheet_summaries(
+        self, sheet_names=None, n_clusters=3, contamination=0.1, max_workers=None
+    ):
+        """Summarize several worksheets of an XLSX file, read concurrently."""
+        sheets = read_excel_sheets(
+            self.file_path, sheet_names, self.usecols, self.nrows, max_workers
+        )
+        summaries = {}
+        for name, data in sheets.items():
+            service = FileSummaryService(
+                self.file_path,
+                self.cache,
+                name,
+                self.usecols,
+                self.nrows,
+                self.optimize_memory,
+            )
+            service.data = data
+            if self.optimize_memory:
+                service.memory_report = optimize_dtypes(data)
+            summaries[name] = service.generate_summary(n_clusters, contamination)
+        return summaries
+
+    def state_path(self):
+        """Path of the incremental summary state stored next to the file."""
+        return f"{self.file_path}.summary-state.json"
 
+    def _fingerprint(self, offset, window=65536):
+        """Hash the head and tail of the first ``offset`` bytes of the file."""
+        h = hashlib.sha256()
+        with open(self.file_path, "rb") as f:
+            h.update(f.read(min(window, offset)))
+            f.seek(max(0, offset - window))
+            h.update(f.read(min(window, offset)))
+        return h.hexdigest()
+
+    def _read_csv_range(self, start, end, columns=None):
+        """Parse the CSV bytes in [start, end); header row only when start is 0."""
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            chunk = f.read(end - start)
+        if columns is None:
+            return pd.read_csv(io.BytesIO(chunk))
+        if not chunk.strip():
+            return pd.DataFrame(columns=columns)
+        return pd.read_csv(io.BytesIO(chunk), header=None, names=columns)
+
+    def generate_incremental_summary(self, n_clusters=3):
+        """Summarize the file, reprocessing only rows appended since last time.
+
+        Counts, moments, quantile sketches, value frequencies and cluster
+        centroids are kept in a state file next to the data. If the file was
+        rewritten rather than appended to, the state is rebuilt from scratch.
+        Anomaly detection and sentiment need the full column and are left out.
+        """
+        file_ext = os.path.splitext(self.file_path)[1].lower()
+        if file_ext not in (".csv", ".xlsx"):
+            raise ValueError("Unsupported file format. Use CSV or XLSX.")
+        state = SummaryState.load(self.state_path())
+        if state is not None and state.clusters.n_clusters != n_clusters:
+            state = None
+
+        if file_ext == ".csv":
+            size = os.path.getsize(self.file_path)
+            if (
+                state is not None
+                and state.offset <= size
+                and state.fingerprint == self._fingerprint(state.offset)
+            ):
+                state.update(self._read_csv_range(state.offset, size, state.columns))
+            else:
+                state = SummaryState.from_frame(
+                    self._read_csv_range(0, size), n_clusters
+                )
+            state.offset = size
+            state.fingerprint = self._fingerprint(size)
+        else:
+            if state is not None:
+                appended = pd.read_excel(
+                    self.file_path,
+                    sheet_name=self.sheet_name,
+                    skiprows=range(1, state.offset + 1),
+                    engine=excel_engine(),
+                )
+                if list(appended.columns) != state.columns:
+                    state = None
+            if state is None:
+                state = SummaryState.from_frame(
+                    read_excel_sheet(self.file_path, self.sheet_name), n_clusters
+                )
+            else:
+                state.update(appended)
+            state.offset = state.rows
+
+        state.save(self.state_path())
+        self.summary = to_json_types(
+            state.to_summary(os.path.basename(self.file_path))
+        )
         return self.summary
 
     def print_summary(self):
@@ -130,6 +377,12 @@ class FileSummaryService:
         summary = self.generate_summary()
         print(f"File Summary for: {summary['file_name']}")
         print(f"Rows: {summary['rows']}, Columns: {summary['columns']}")
+        if summary.get("memory"):
+            memory = summary["memory"]
+            print(
+                f"Memory: {memory['before_bytes']:,} -> {memory['after_bytes']:,} bytes"
+                f" ({memory['saved_pct']:.1f}% saved)"
+            )
         print("\nColumn Details:")
         for col, details in summary["column_details"].items():
             print(f"\nColumn: {col}")
@@ -142,13 +395,17 @@ class FileSummaryService:
             print("\nClustering Results:")
             print(f"  Cluster Counts: {summary['clustering']['cluster_counts']}")
             print(f"  Cluster Centers: {summary['clustering']['cluster_centers']}")
+        if summary["anomalies"]:
+            print("\nAnomaly Detection Results:")
+            print(f"  Anomaly Count: {summary['anomalies']['anomaly_count']}")
+            print(f"  Anomaly Row Indices: {summary['anomalies']['anomaly_indices']}")
 
     def save_summary(self, output_path):
         """Save the summary to a JSON file."""
         import json
 
         with open(output_path, "w") as f:
-            json.dump(self.summary, f, indent=4)
+            json.dump(self.summary, f, indent=4, default=json_default)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+"""Offline stand-ins for the Azure ML scoring endpoint and the GPT-4 call."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from payload_formats import decode_payload
+
+
+def start_stub_scoring_server(latency_ms=5.0, host="127.0.0.1", port=0):
+    """Serve a fake /score endpoint in a background thread.
+
+    It decodes the body the way score.run does, answers every row with 0.0
+    after ``latency_ms`` (or 400 if the body would not decode), over
+    keep-alive HTTP/1.1 so connection reuse is visible in benchmarks.
+    Returns ``(server, url)``; call ``server.shutdown()`` when done.
+    """
+
+    class StubScoreHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately; avoid the Nagle/delayed-ACK stall
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw_data = self.rfile.read(length)
+            server.requests += 1
+            server.connections.add(self.client_address)
+            time.sleep(latency_ms / 1000.0)
+            try:
+                rows = decode_payload(raw_data, self.headers.get("Content-Type"))
+                # the model needs numbers; dicts or strings fail like predict() would
+                rows = rows.astype(np.float64)
+                status, result = 200, [0.0] * len(rows)
+            except (KeyError, TypeError, ValueError) as exc:
+                status, result = 400, {"error": str(exc)}
+            body = json.dumps(result).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubScoreHandler)
+    server.daemon_threads = True
+    server.requests = 0
+    server.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/score"
+
+
+def make_stub_llm(latency_ms=300.0):
+    """Return a drop-in for openai_interface.extract_with_llm.
+
+    It sleeps ``latency_ms`` to mimic the GPT-4 round trip and returns a
+    fixed structured input.
+    """
+
+    def extract_with_llm(nl_input):
+        time.sleep(latency_ms / 1000.0)
+        return {"TOTAL_JOURNALS": 100, "TOTAL_AMOUNT": 50000, "AVG_AMOUNT": 500}
+
+    return extract_with_llm
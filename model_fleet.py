@@ -0,0 +1,154 @@
+"""One linear balance model per SAP_BOOK_ID, trained and scored in batch.
+
+Training builds every book's normal equations at once: rows are centred
+per book, the p x p Gram matrices and X'y vectors are accumulated with one
+``np.bincount`` per matrix entry, and all systems are solved together with
+a batched ``np.linalg.solve`` (a small ridge term keeps short or constant
+histories solvable). Scoring maps book ids to coefficient rows with a
+single index lookup and computes ``sum(X * coef[rows], axis=1)``, so there
+is no per-book Python loop on either path. Books with fewer than
+``min_rows`` training rows, and books never seen in training, use the
+global model stored as the last coefficient row.
+
+Train one with ``python training_pipeline.py --fleet balance_fleet.npz``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import FEATURE_COLUMNS
+
+
+def _grouped_fit(X, y, groups, n_groups, alpha):
+    """Solve ridge-regularised least squares for every group at once.
+
+    Returns (coef, intercept, counts) with one row per group. Features are
+    centred per group, so the intercept is left unpenalised.
+    """
+    n, p = X.shape
+    counts = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    safe = np.maximum(counts, 1.0)[:, None]
+    x_mean = (
+        np.stack(
+            [
+                np.bincount(groups, weights=X[:, j], minlength=n_groups)
+                for j in range(p)
+            ],
+            axis=1,
+        )
+        / safe
+    )
+    y_mean = np.bincount(groups, weights=y, minlength=n_groups) / safe[:, 0]
+    Xc = X - x_mean[groups]
+    yc = y - y_mean[groups]
+
+    gram = np.empty((n_groups, p, p))
+    xty = np.empty((n_groups, p))
+    for i in range(p):
+        xty[:, i] = np.bincount(groups, weights=Xc[:, i] * yc, minlength=n_groups)
+        for j in range(i, p):
+            entry = np.bincount(groups, weights=Xc[:, i] * Xc[:, j], minlength=n_groups)
+            gram[:, i, j] = entry
+            gram[:, j, i] = entry
+    gram += alpha * np.eye(p)
+    coef = np.linalg.solve(gram, xty[:, :, None])[:, :, 0]
+    intercept = y_mean - np.einsum("gp,gp->g", x_mean, coef)
+    return coef, intercept, counts
+
+
+class ModelFleet:
+    """Per-book linear models with a global fallback.
+
+    ``fit(X, y, groups)`` and ``predict(X, groups)`` take the book id of
+    every row; ``groups`` may be strings or integer codes. ``alpha`` is the
+    ridge penalty applied to standardised features.
+    """
+
+    grouped = True
+
+    def __init__(self, min_rows=20, alpha=1e-3, feature_names=None):
+        self.min_rows = min_rows
+        self.alpha = alpha
+        self.feature_names = list(feature_names or FEATURE_COLUMNS)
+
+    def fit(self, X, y, groups):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        codes, books = pd.factorize(np.asarray(groups), sort=True)
+
+        # standardise globally so alpha means the same for every feature
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Xs = (X - mean) / scale
+
+        coef, intercept, counts = _grouped_fit(Xs, y, codes, len(books), self.alpha)
+        global_coef, global_intercept, _ = _grouped_fit(
+            Xs, y, np.zeros(len(y), dtype=np.intp), 1, self.alpha
+        )
+        keep = counts >= self.min_rows
+        books = np.asarray(books)[keep]
+        coef = np.vstack([coef[keep], global_coef]) / scale
+        intercept = np.concatenate([intercept[keep], global_intercept])
+        self._set(books, coef, intercept - coef @ mean, counts[keep])
+        return self
+
+    def _set(self, books, coef, intercept, counts):
+        self.books = books
+        self.coef = coef
+        self.intercept = intercept
+        self.counts = counts
+        self._index = pd.Index(books)
+
+    @property
+    def n_books(self):
+        return len(self.books)
+
+    def rows_for(self, groups):
+        """Coefficient row for each book id; unknown books get the global row."""
+        rows = self._index.get_indexer(np.asarray(groups))
+        rows[rows < 0] = len(self.books)
+        return rows
+
+    def predict(self, X, groups):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = self.rows_for(groups)
+        return np.einsum("ij,ij->i", X, self.coef[rows]) + self.intercept[rows]
+
+    def save(self, path):
+        books = np.asarray(self.books)
+        if books.dtype.kind not in "iu":
+            # integer ids keep their dtype so rows_for still matches them
+            books = books.astype(str)
+        np.savez(
+            path,
+            books=books,
+            coef=self.coef,
+            intercept=self.intercept,
+            counts=self.counts,
+            feature_names=np.asarray(self.feature_names, dtype=str),
+            min_rows=self.min_rows,
+            alpha=self.alpha,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            fleet = cls(
+                int(npz["min_rows"]),
+                float(npz["alpha"]),
+                [str(name) for name in npz["feature_names"]],
+            )
+            fleet._set(npz["books"], npz["coef"], npz["intercept"], npz["counts"])
+        return fleet
+
+
+def is_fleet(path):
+    """True if ``path`` is an .npz written by ``ModelFleet.save``."""
+    if not path.endswith(".npz"):
+        return False
+    with np.load(path, allow_pickle=False) as npz:
+        return "books" in npz.files
@@ -0,0 +1,297 @@
+"""Local, content-addressed registry of balance model versions.
+
+    <root>/versions/<version>/balance_model.npz   artifacts as registered
+    <root>/versions/<version>/metadata.json       features, metrics, window
+    <root>/current                                 id of the live version
+    <root>/history.jsonl                           one line per promotion
+
+A version id is the SHA-256 of the artifact contents, so registering the
+same model twice is a no-op. ``promote`` replaces ``current`` atomically;
+``ModelHandle`` stats that pointer at most every ``check_interval`` seconds
+and swaps the loaded model in place, so a scoring process follows
+promotions and rollbacks without a restart.
+
+    python model_registry.py models register balance_model.npz balance_model.pkl
+    python model_registry.py models promote 3f9c1e2a7b4d
+    python model_registry.py models list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from compiled_model import load_model
+
+VERSION_LENGTH = 12
+# preferred artifact when a version holds several model files
+MODEL_EXTENSIONS = (".npz", ".json", ".pkl")
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def content_version(paths):
+    """Version id for a set of artifact files (names and contents)."""
+    h = hashlib.sha256()
+    for path in sorted(paths, key=os.path.basename):
+        h.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:VERSION_LENGTH]
+
+
+class ModelRegistry:
+    """Directory of immutable model versions plus a ``current`` pointer."""
+
+    def __init__(self, root, max_loaded=4):
+        self.root = root
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "versions"), exist_ok=True)
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.root, "current")
+
+    def version_dir(self, version):
+        return os.path.join(self.root, "versions", version)
+
+    def register(self, paths, metadata=None):
+        """Copy artifacts into the registry; returns the version id.
+
+        ``metadata`` is stored alongside (features, metrics, training
+        window, ...). Re-registering identical artifacts returns the
+        existing version and leaves its metadata untouched.
+        """
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        version = content_version(paths)
+        target = self.version_dir(version)
+        if os.path.exists(os.path.join(target, "metadata.json")):
+            return version
+
+        staging = tempfile.mkdtemp(dir=os.path.join(self.root, "versions"))
+        try:
+            for path in paths:
+                shutil.copy2(path, os.path.join(staging, os.path.basename(path)))
+            record = dict(metadata or {})
+            record.update(
+                {
+                    "version": version,
+                    "files": sorted(os.path.basename(p) for p in paths),
+                    "registered_at": datetime.now(timezone.utc).isoformat(),
+                }
+            )
+            with open(os.path.join(staging, "metadata.json"), "w") as f:
+                json.dump(record, f, indent=2, sort_keys=True)
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(target):
+                raise
+        return version
+
+    def versions(self):
+        """Metadata of every version, oldest first."""
+        records = []
+        for version in os.listdir(os.path.join(self.root, "versions")):
+            try:
+                records.append(self.metadata(version))
+            except (OSError, ValueError):
+                continue  # staging directory or partial copy
+        return sorted(records, key=lambda r: r["registered_at"])
+
+    def metadata(self, version):
+        with open(os.path.join(self.version_dir(version), "metadata.json")) as f:
+            return json.load(f)
+
+    def current(self):
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def promote(self, version):
+        """Point ``current`` at ``version``; returns the previous version."""
+        return self._activate(version)
+
+    def _activate(self, version, rollback=False):
+        self.metadata(version)  # raises if the version does not exist
+        previous = self.current()
+        _write_atomic(self.pointer_path, version + "\n")
+        record = {
+            "version": version,
+            "previous": previous,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        if rollback:
+            record["rollback"] = True
+        with open(os.path.join(self.root, "history.jsonl"), "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return previous
+
+    def _live_stack(self):
+        """Promoted versions still on the stack, oldest first.
+
+        A promotion pushes its version and a rollback pops one, so repeated
+        rollbacks walk back through the promotions instead of toggling
+        between the last two versions.
+        """
+        try:
+            with open(os.path.join(self.root, "history.jsonl")) as f:
+                history = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            history = []
+        stack = []
+        for record in history:
+            if record.get("rollback"):
+                if stack:
+                    stack.pop()
+                if not stack or stack[-1] != record["version"]:
+                    stack.append(record["version"])
+            elif not stack or stack[-1] != record["version"]:
+                if not stack and record["previous"]:
+                    stack.append(record["previous"])
+                stack.append(record["version"])
+        return stack
+
+    def rollback(self):
+        """Re-activate the version promoted before the current one."""
+        stack = self._live_stack()
+        if len(stack) < 2:
+            raise ValueError("No earlier version to roll back to")
+        version = stack[-2]
+        self._activate(version, rollback=True)
+        return version
+
+    def model_path(self, version):
+        files = self.metadata(version)["files"]
+        for extension in MODEL_EXTENSIONS:
+            for name in files:
+                if name.endswith(extension):
+                    return os.path.join(self.version_dir(version), name)
+        raise ValueError(f"Version {version} has no model artifact: {files}")
+
+    def load(self, version=None):
+        """Load a version (default: current), reusing recently loaded models."""
+        version = version or self.current()
+        if version is None:
+            raise ValueError(f"{self.root}: no current model version")
+        with self._lock:
+            model = self._loaded.get(version)
+            if model is not None:
+                self._loaded.move_to_end(version)
+                return model
+        model = load_model(self.model_path(version))
+        with self._lock:
+            self._loaded[version] = model
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return model
+
+
+class ModelHandle:
+    """The registry's current model, reloaded when ``current`` changes."""
+
+    def __init__(self, registry, check_interval=1.0):
+        self.registry = registry
+        self.check_interval = check_interval
+        self.model = None
+        self.version = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _pointer_stamp(self):
+        try:
+            st = os.stat(self.registry.pointer_path)
+        except FileNotFoundError:
+            return None
+        # promote() replaces the file, so the inode changes on every switch
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def reload(self):
+        with self._lock:
+            stamp = self._pointer_stamp()
+            version = self.registry.current()
+            if version != self.version:
+                # assign both at once so readers never see a mismatched pair
+                self.model, self.version = self.registry.load(version), version
+            self._stamp = stamp
+        return self.model
+
+    def get(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            if self._pointer_stamp() != self._stamp:
+                self.reload()
+        return self.model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="Registry directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    register = commands.add_parser("register")
+    register.add_argument("files", nargs="+")
+    register.add_argument("--metadata", help="JSON file with extra metadata")
+    register.add_argument("--promote", action="store_true")
+    commands.add_parser("list")
+    show = commands.add_parser("show")
+    show.add_argument("version", nargs="?")
+    promote = commands.add_parser("promote")
+    promote.add_argument("version")
+    commands.add_parser("rollback")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "register":
+        metadata = None
+        if args.metadata:
+            with open(args.metadata) as f:
+                metadata = json.load(f)
+        version = registry.register(args.files, metadata)
+        print(f"✅ Registered {version}")
+        if args.promote:
+            registry.promote(version)
+            print(f"✅ Promoted {version}")
+    elif args.command == "list":
+        current = registry.current()
+        for record in registry.versions():
+            marker = "*" if record["version"] == current else " "
+            print(
+                f"{marker} {record['version']}  {record['registered_at']}  "
+                f"{json.dumps(record.get('metrics', {}))}"
+            )
+    elif args.command == "show":
+        version = args.version or registry.current()
+        print(json.dumps(registry.metadata(version), indent=2))
+    elif args.command == "promote":
+        previous = registry.promote(args.version)
+        print(f"✅ Promoted {args.version} (was {previous})")
+    elif args.command == "rollback":
+        version = registry.rollback()
+        print(f"✅ Rolled back to {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Cache key for an input sentence: case-folded, whitespace collapsed.
+
+    None gives "" so callers can reject a missing input with a 400.
+    """
+    if text is None:
+        return ""
+    return " ".join(text.casefold().split())
+
+
+class NLCache:
+    """Two-tier cache of natural-language -> structured input conversions.
+
+    The first tier is an in-process LRU of ``max_entries`` items. The
+    optional second tier is a SQLite file shared across processes and
+    restarts; entries older than ``ttl_seconds`` are ignored and the table
+    is trimmed to the ``max_db_entries`` most recently used rows.
+    """
+
+    def __init__(
+        self,
+        max_entries=1024,
+        db_path=None,
+        ttl_seconds=7 * 24 * 3600,
+        max_db_entries=100000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS nl_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS nl_cache_accessed ON nl_cache (accessed)"
+            )
+            self._db.commit()
+
+    def _expired(self, created, now):
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, text):
+        """Return a cached value for ``text`` or None."""
+        key = normalize_text(text)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(entry[0])
+            self._memory.pop(key, None)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM nl_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute(
+                        "UPDATE nl_cache SET accessed = ? WHERE key = ?", (now, key)
+                    )
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.db_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, text, value):
+        key = normalize_text(text)
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._remember(key, encoded, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO nl_cache VALUES (?, ?, ?, ?)",
+                    (key, encoded, now, now),
+                )
+                self._evict_db(now)
+                self._db.commit()
+
+    def _evict_db(self, now):
+        if self.ttl_seconds is not None:
+            self._db.execute(
+                "DELETE FROM nl_cache WHERE created < ?", (now - self.ttl_seconds,)
+            )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM nl_cache").fetchone()
+        if count > self.max_db_entries:
+            self._db.execute(
+                "DELETE FROM nl_cache WHERE key IN ("
+                "SELECT key FROM nl_cache ORDER BY accessed LIMIT ?)",
+                (count - self.max_db_entries,),
+            )
+
+    def get_or_compute(self, text, compute):
+        """Return the cached value for ``text``, calling ``compute(text)`` on a miss."""
+        value = self.get(text)
+        if value is None:
+            value = compute(text)
+            self.put(text, value)
+        return value
+
+    def stats(self):
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM nl_cache")
+                self._db.commit()
@@ -0,0 +1,174 @@
+import re
+import threading
+
+NUMBER = r"\$?\s*(?P<{name}>(?:\d{{1,3}}(?:,\d{{3}})+|\d+)(?:\.\d+)?|\.\d+)\s*(?P<{name}_unit>k|thousand|mm|m|million|bn|b|billion)?\b"
+
+MULTIPLIERS = {
+    "k": 1e3,
+    "thousand": 1e3,
+    "m": 1e6,
+    "mm": 1e6,
+    "million": 1e6,
+    "b": 1e9,
+    "bn": 1e9,
+    "billion": 1e9,
+}
+
+JOURNAL_WORDS = (
+    r"(?:journal(?:\s+entr(?:y|ies))?s?|entr(?:y|ies)|postings?|transactions?|txns?)"
+)
+
+
+def _number(name):
+    return NUMBER.format(name=name)
+
+
+COUNT_PATTERNS = [
+    re.compile(_number("count") + r"\s*" + JOURNAL_WORDS, re.I),
+    re.compile(
+        r"(?:number of|count of|no\.? of|#)\s*"
+        + JOURNAL_WORDS
+        + r"?\s*(?:is|of|=|:)?\s*"
+        + _number("count"),
+        re.I,
+    ),
+    re.compile(
+        JOURNAL_WORDS + r"\s*(?:count)?\s*(?:=|:|of)\s*" + _number("count"), re.I
+    ),
+]
+
+TOTAL_PATTERNS = [
+    re.compile(
+        r"(?:total(?:l?ing)?|sum(?:ming)?|amount(?:ing)?|worth|value)"
+        r"(?:\s*[=:]|\s+(?:amount|value|of|to|is|at))*\s*" + _number("total"),
+        re.I,
+    ),
+    re.compile(_number("total") + r"\s*(?:in\s+)?total\b", re.I),
+    re.compile(_number("total") + r"\s*(?:across|over|from|in)\s+\d", re.I),
+]
+
+AVG_PATTERNS = [
+    re.compile(
+        r"(?:averag(?:e|ing)|avg\.?|mean)"
+        r"(?:\s*[=:]|\s+(?:amount|value|size|of|at|is|per\s+\w+))*\s*" + _number("avg"),
+        re.I,
+    ),
+    re.compile(
+        _number("avg") + r"\s*(?:on\s+)?(?:average|avg|each|apiece|per\s+\w+)\b", re.I
+    ),
+]
+
+
+def _to_number(match, name):
+    value = float(match.group(name).replace(",", ""))
+    unit = match.group(f"{name}_unit")
+    if unit:
+        value *= MULTIPLIERS[unit.lower()]
+    return value
+
+
+def _candidates(patterns, text, name):
+    """Every (span, value) the patterns find for one slot."""
+    return {
+        match.span(name): _to_number(match, name)
+        for pattern in patterns
+        for match in pattern.finditer(text)
+    }
+
+
+def _overlaps(span, spans):
+    return any(span[0] < end and start < span[1] for start, end in spans)
+
+
+def _without(candidates, spans):
+    return {
+        span: value for span, value in candidates.items() if not _overlaps(span, spans)
+    }
+
+
+def _value(candidates):
+    """The slot's value: None if nothing matched, _AMBIGUOUS on disagreement."""
+    values = set(candidates.values())
+    if len(values) > 1:
+        return _AMBIGUOUS
+    return values.pop() if values else None
+
+
+_AMBIGUOUS = object()
+
+
+def _clean(value):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
+class FastPathParser:
+    """Regex extraction of TOTAL_JOURNALS / TOTAL_AMOUNT / AVG_AMOUNT.
+
+    Handles the common phrasings ("120 journals totalling 50k averaging
+    400", "$1.2m across 300 entries") including k/m/bn suffixes. When two of
+    the three values are present the third is derived. Returns None when
+    the sentence cannot be fully resolved so the caller can fall back to the
+    LLM. ``stats()`` reports how often the fast path was sufficient.
+    """
+
+    def __init__(self):
+        self.parsed = 0
+        self.fallthrough = 0
+        self._lock = threading.Lock()
+
+    def parse(self, text):
+        result = self._extract(text)
+        with self._lock:
+            if result is None:
+                self.fallthrough += 1
+            else:
+                self.parsed += 1
+        return result
+
+    def _extract(self, text):
+        # "<n> journals" is the most specific phrasing, so the count claims
+        # its numbers first and total and average may not reuse them
+        counts = _candidates(COUNT_PATTERNS, text, "count")
+        totals = _without(_candidates(TOTAL_PATTERNS, text, "total"), counts)
+        avgs = _without(_candidates(AVG_PATTERNS, text, "avg"), counts)
+        # a number matched as both total and average goes to whichever slot
+        # has no other number; if neither has one the LLM decides
+        free_totals = _without(totals, avgs)
+        free_avgs = _without(avgs, totals)
+        if len(free_totals) < len(totals) or len(free_avgs) < len(avgs):
+            if not free_totals and not free_avgs:
+                return None
+            totals = free_totals or totals
+            avgs = free_avgs or avgs
+        count, total, avg = _value(counts), _value(totals), _value(avgs)
+        if _AMBIGUOUS in (count, total, avg):
+            return None
+
+        if count is None and total is not None and avg:
+            count = total / avg
+            if abs(count - round(count)) > 1e-6:
+                return None
+            count = round(count)
+        if count is None or (total is None and avg is None):
+            return None
+        if count != int(count):
+            return None
+        if total is None:
+            total = count * avg
+        elif avg is None:
+            if count == 0:
+                return None
+            avg = total / count
+        return {
+            "TOTAL_JOURNALS": int(count),
+            "TOTAL_AMOUNT": _clean(total),
+            "AVG_AMOUNT": _clean(avg),
+        }
+
+    def stats(self):
+        attempts = self.parsed + self.fallthrough
+        return {
+            "parsed": self.parsed,
+            "fallthrough": self.fallthrough,
+            "coverage": self.parsed / attempts if attempts else 0.0,
+        }
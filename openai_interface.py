@@ -1,9 +1,23 @@
 
+import os
+
 import openai
 
+from nl_cache import NLCache
+from nl_fast_parser import FastPathParser
+
 openai.api_key = "YOUR_OPENAI_API_KEY"
 
-def get_structured_input_from_nl(nl_input: str):
+# temperature is 0, so the same sentence always maps to the same features;
+# set NL_CACHE_DB to also share conversions across processes and restarts
+nl_cache = NLCache(
+    max_entries=int(os.getenv("NL_CACHE_SIZE", "1024")),
+    db_path=os.getenv("NL_CACHE_DB"),
+    ttl_seconds=float(os.getenv("NL_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+)
+fast_parser = FastPathParser()
+
+def extract_with_llm(nl_input: str):
     prompt = f"""
 You are a helpful assistant. Convert the following natural language into a JSON object with keys:
 - TOTAL_JOURNALS
@@ -23,3 +37,13 @@ JSON:
 
     output = response['choices'][0]['message']['content']
     return eval(output)  # ⚠️ In production, use `json.loads` safely
+
+def get_structured_input_from_nl(nl_input: str):
+    # Common phrasings are resolved locally; only the rest reach GPT-4
+    structured_input = fast_parser.parse(nl_input)
+    if structured_input is not None:
+        return structured_input
+    return nl_cache.get_or_compute(nl_input, extract_with_llm)
+
+def get_parser_stats():
+    return {"fast_path": fast_parser.stats(), "cache": nl_cache.stats()}
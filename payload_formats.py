@@ -0,0 +1,150 @@
+"""Request payload formats accepted by score.run.
+
+- JSON ``{"data": [[...], ...]}`` (the original format), parsed with
+  orjson when it is installed
+- raw little-endian float64: ``b"F64L"``, uint32 rows, uint32 cols, then
+  the row-major values, read zero-copy with ``np.frombuffer``
+- NPY, as written by ``np.save``
+- Arrow IPC stream or file; columns named like FEATURE_COLUMNS are put in
+  model order, otherwise the table's column order is used
+
+The format comes from a specific Content-Type when one is given,
+otherwise from the payload's leading bytes. application/octet-stream is
+sniffed too and only falls back to raw when no magic bytes match.
+"""
+
+import io
+import json
+import struct
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from compiled_model import FEATURE_COLUMNS
+
+RAW_MAGIC = b"F64L"
+RAW_HEADER = struct.Struct("<4sII")
+NPY_MAGIC = b"\x93NUMPY"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-npy": "npy",
+    "application/x-float64": "raw",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+}
+
+
+# what most HTTP clients send for any bytes body, so the magic bytes decide
+# and raw is only the fallback
+GENERIC_BINARY = "application/octet-stream"
+
+
+def _sniff(head):
+    if head.startswith(RAW_MAGIC):
+        return "raw"
+    if head.startswith(NPY_MAGIC):
+        return "npy"
+    if head.startswith(ARROW_FILE_MAGIC) or head.startswith(ARROW_STREAM_MAGIC):
+        return "arrow"
+    return None
+
+
+def detect_format(raw_data, content_type=None):
+    media_type = None
+    if content_type:
+        media_type = content_type.split(";")[0].strip().lower()
+        fmt = CONTENT_TYPES.get(media_type)
+        if fmt is not None:
+            return fmt
+    if isinstance(raw_data, str):
+        return "json"
+    fmt = _sniff(bytes(raw_data[:8]))
+    if fmt is None:
+        fmt = "raw" if media_type == GENERIC_BINARY else "json"
+    return fmt
+
+
+def decode_json(raw_data):
+    if orjson is not None:
+        return np.array(orjson.loads(raw_data)["data"])
+    return np.array(json.loads(raw_data)["data"])
+
+
+def decode_raw(raw_data):
+    magic, rows, cols = RAW_HEADER.unpack_from(raw_data)
+    if magic != RAW_MAGIC:
+        raise ValueError("Raw payload must start with b'F64L'")
+    expected = RAW_HEADER.size + rows * cols * 8
+    if len(raw_data) != expected:
+        raise ValueError(f"Raw payload is {len(raw_data)} bytes, expected {expected}")
+    return np.frombuffer(
+        raw_data, dtype="<f8", count=rows * cols, offset=RAW_HEADER.size
+    ).reshape(rows, cols)
+
+
+def decode_npy(raw_data):
+    return np.load(io.BytesIO(raw_data), allow_pickle=False)
+
+
+def decode_arrow(raw_data):
+    import pyarrow as pa
+
+    buffer = pa.py_buffer(raw_data)
+    if bytes(raw_data[:6]) == ARROW_FILE_MAGIC:
+        table = pa.ipc.open_file(buffer).read_all()
+    else:
+        table = pa.ipc.open_stream(buffer).read_all()
+    names = table.column_names
+    if set(FEATURE_COLUMNS) <= set(names):
+        names = FEATURE_COLUMNS
+    return np.column_stack(
+        [table.column(name).to_numpy().astype(np.float64) for name in names]
+    )
+
+
+DECODERS = {
+    "json": decode_json,
+    "raw": decode_raw,
+    "npy": decode_npy,
+    "arrow": decode_arrow,
+}
+
+
+def decode_payload(raw_data, content_type=None):
+    """Decode a request body in any supported format into a 2-D array."""
+    data = DECODERS[detect_format(raw_data, content_type)](raw_data)
+    if data.ndim == 1:
+        data = data.reshape(1, -1)
+    return data
+
+
+def encode_raw(X):
+    X = np.ascontiguousarray(X, dtype="<f8")
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    return RAW_HEADER.pack(RAW_MAGIC, X.shape[0], X.shape[1]) + X.tobytes()
+
+
+def encode_npy(X):
+    out = io.BytesIO()
+    np.save(out, np.asarray(X, dtype=np.float64), allow_pickle=False)
+    return out.getvalue()
+
+
+def encode_arrow(X, column_names=None):
+    import pyarrow as pa
+
+    X = np.asarray(X, dtype=np.float64)
+    names = column_names or FEATURE_COLUMNS[: X.shape[1]]
+    table = pa.table({name: X[:, i] for i, name in enumerate(names)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
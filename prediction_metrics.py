@@ -0,0 +1,161 @@
+"""Per-stage latency histograms and sampled profiling for the prediction path.
+
+Stages are timed with ``timed("stage")`` and exported in Prometheus text
+format (``render_prometheus``) or as JSON with p50/p99 estimates
+(``snapshot``). ``maybe_profile`` runs cProfile for a sampled fraction of
+requests (PROFILE_SAMPLE_RATE) and writes ``<request_id>.prof`` files to
+PROFILE_DIR.
+"""
+
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with one series per stage."""
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(stage)
+            if series is None:
+                series = self._series[stage] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            series["counts"][index] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def _quantile(self, counts, total, q):
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                # linear interpolation inside the bucket, as Prometheus does
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def snapshot(self):
+        with self._lock:
+            series = {
+                stage: (list(s["counts"]), s["sum"], s["count"])
+                for stage, s in self._series.items()
+            }
+        stats = {}
+        for stage, (counts, total_seconds, count) in series.items():
+            stats[stage] = {
+                "count": count,
+                "mean_ms": total_seconds / count * 1000 if count else 0.0,
+                "p50_ms": self._quantile(counts, count, 0.50) * 1000,
+                "p90_ms": self._quantile(counts, count, 0.90) * 1000,
+                "p99_ms": self._quantile(counts, count, 0.99) * 1000,
+            }
+        return stats
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            for stage, s in series:
+                cumulative = 0
+                for bound, count in zip(self.buckets, s["counts"]):
+                    cumulative += count
+                    lines.append(
+                        f'{self.name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{stage="{stage}",le="+Inf"}} {s["count"]}'
+                )
+                lines.append(f'{self.name}_sum{{stage="{stage}"}} {s["sum"]}')
+                lines.append(f'{self.name}_count{{stage="{stage}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+stage_seconds = Histogram(
+    "prediction_stage_seconds", "Time spent in each stage of the prediction path."
+)
+
+
+@contextmanager
+def timed(stage, histogram=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram or stage_seconds).observe(stage, time.perf_counter() - start)
+
+
+def render_prometheus():
+    return stage_seconds.render()
+
+
+def snapshot():
+    return stage_seconds.snapshot()
+
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+
+@contextmanager
+def maybe_profile(request_id, sample_rate=None):
+    """Profile the block for a sampled fraction of requests."""
+    rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler; skip this sample
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{request_id}.prof"))
@@ -1,15 +1,80 @@
 # score.py
-import joblib
-import json
-import numpy as np
 import os
 
+from payload_formats import decode_payload
+from prediction_metrics import timed
+
+model_handle = None
+router = None
+monitor = None
+
 def init():
-    global model
-    model_path = os.path.join(os.getenv('AZUREML_MODEL_DIR'), 'balance_model.pkl')
-    model = joblib.load(model_path)
+    global model, model_handle, router, monitor
+    load_primary()
+    # Optional blue/green split or shadow scoring of a candidate version
+    from serving_router import router_from_env
+    router = router_from_env(predict_primary)
+    # Optional feature/prediction drift monitoring (DRIFT_REFERENCE)
+    from drift_monitor import monitor_from_env
+    monitor = monitor_from_env()
+
+def load_primary():
+    global model, model_handle
+    registry_dir = os.getenv('MODEL_REGISTRY_DIR')
+    if registry_dir:
+        # Follow the registry's `current` pointer: promoting or rolling back
+        # a version swaps the model on the next request, without a restart
+        from model_registry import ModelHandle, ModelRegistry
+        model_handle = ModelHandle(
+            ModelRegistry(registry_dir),
+            check_interval=float(os.getenv('MODEL_RELOAD_INTERVAL', '1')),
+        )
+        model = model_handle.model
+        return
+    model_dir = os.getenv('AZUREML_MODEL_DIR')
+    compiled_path = model_file(model_dir, 'balance_model.npz')
+    if os.path.exists(compiled_path):
+        # Exported by compiled_model.py: no unpickling and no sklearn import
+        from compiled_model import CompiledLinearModel
+        model = CompiledLinearModel.load(compiled_path)
+    else:
+        import joblib
+        model_path = model_file(model_dir, 'balance_model.pkl')
+        model = joblib.load(model_path)
+
+def model_file(model_dir, name):
+    """``name`` in the model dir or in the balance_model/ folder deploy.py uploads."""
+    path = os.path.join(model_dir, name)
+    if os.path.exists(path):
+        return path
+    return os.path.join(model_dir, 'balance_model', name)
+
+def decode(raw_data, content_type=None):
+    """Turn a request body into the 2-D feature array passed to the model.
+
+    Besides the JSON {"data": [...]} document this accepts raw float64,
+    NPY and Arrow IPC bodies; see payload_formats.
+    """
+    return decode_payload(raw_data, content_type)
+
+def predict_primary(data):
+    if model_handle is not None:
+        return model_handle.get().predict(data)
+    return model.predict(data)
+
+def predict(data, request_id=None):
+    if router is not None:
+        predictions = router.predict(data, request_id)
+    else:
+        predictions = predict_primary(data)
+    if monitor is not None:
+        with timed('drift_observe'):
+            monitor.observe(data, predictions, request_id)
+    return predictions
 
 def run(raw_data):
-    data = np.array(json.loads(raw_data)['data'])
-    predictions = model.predict(data).tolist()
-    return predictions
\ No newline at end of file
+    with timed('score_decode'):
+        data = decode(raw_data)
+    with timed('score_predict'):
+        predictions = predict(data).tolist()
+    return predictions
@@ -0,0 +1,209 @@
+"""Local micro-batching scoring service around score.py.
+
+Concurrent requests are queued for up to ``max_wait_ms`` (or until
+``max_batch_rows`` rows are waiting), scored with a single vectorized
+``predict`` call and the predictions are scattered back to each caller.
+
+    python score_batching.py --model-dir ./model --port 5001
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import score
+from prediction_metrics import render_prometheus, timed
+
+
+class MicroBatcher:
+    """Coalesce concurrent predict calls into one model call."""
+
+    def __init__(
+        self, predict_fn, max_batch_rows=512, max_wait_ms=2.0, n_features=None
+    ):
+        self.predict_fn = predict_fn
+        self.n_features = n_features
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """Queue a 2-D array of rows; returns a Future of the prediction list."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if rows.ndim != 2:
+            raise ValueError(f"Expected a 2-D array of rows, got {rows.ndim}-D")
+        if self.n_features is not None and rows.shape[1] != self.n_features:
+            raise ValueError(
+                f"Rows have {rows.shape[1]} features, model expects {self.n_features}"
+            )
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def predict(self, rows, timeout=None):
+        return self.submit(rows).result(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        n_rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # score each width separately so one malformed request cannot
+            # fail the well-formed requests batched with it
+            by_width = {}
+            for item in batch:
+                by_width.setdefault(item[0].shape[1], []).append(item)
+            for group in by_width.values():
+                self._score(group)
+
+    def _score(self, batch):
+        try:
+            X = batch[0][0] if len(batch) == 1 else np.vstack([r for r, _ in batch])
+            predictions = np.asarray(self.predict_fn(X))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(X)
+        start = 0
+        for rows, future in batch:
+            end = start + len(rows)
+            future.set_result(predictions[start:end].tolist())
+            start = end
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+def make_handler(batcher):
+    class ScoreHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for load-test clients
+        # headers and body are written separately; avoid the Nagle/delayed-ACK stall
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._reply(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                with timed("score_decode"):
+                    rows = score.decode(
+                        self.rfile.read(length), self.headers.get("Content-Type")
+                    )
+                with timed("score_batched_predict"):
+                    predictions = batcher.predict(rows)
+                self._reply(200, predictions)
+            except Exception as e:
+                self._reply(400, {"error": str(e)})
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self._reply(404, {"error": "not found"})
+                return
+            body = render_prometheus().encode("utf-8")
+            self._reply(200, body, "text/plain; version=0.0.4")
+
+        def _reply(self, status, payload, content_type="application/json"):
+            if isinstance(payload, bytes):
+                body = payload
+            else:
+                body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if "X-Request-ID" in self.headers:
+                self.send_header("X-Request-ID", self.headers["X-Request-ID"])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoreHandler
+
+
+def model_width(model):
+    """Number of input columns ``model`` expects, or None if it is unknown."""
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features is None and getattr(model, "feature_names", None):
+        n_features = len(model.feature_names)
+    return n_features
+
+
+def make_server(host="127.0.0.1", port=5001, max_batch_rows=512, max_wait_ms=2.0):
+    """Build the HTTP server; score.init() must have been called."""
+    batcher = MicroBatcher(
+        score.predict, max_batch_rows, max_wait_ms, model_width(score.model)
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    server.batcher = batcher
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", default=os.getenv("AZUREML_MODEL_DIR", "."))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--max-batch-rows", type=int, default=512)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    os.environ["AZUREML_MODEL_DIR"] = args.model_dir
+    score.init()
+    server = make_server(args.host, args.port, args.max_batch_rows, args.max_wait_ms)
+    print(f"Scoring on http://{args.host}:{args.port}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
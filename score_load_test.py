@@ -0,0 +1,152 @@
+"""Local load test for the micro-batching scoring service.
+
+Starts score_batching's server in-process (or targets --url), drives it
+with concurrent keep-alive clients and reports throughput and p50/p99
+latency. --compare also runs with batching disabled for a baseline.
+
+    python score_load_test.py --synthetic --clients 32 --requests 200 --compare
+"""
+
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+import score
+import score_batching
+
+N_FEATURES = 4  # DATE_ORDINAL, JOURNAL_COUNT, JOURNAL_TOTAL_AMOUNT, JOURNAL_AVG_AMOUNT
+
+
+def write_synthetic_model(model_dir):
+    """Fit a LinearRegression on random data and save it as balance_model.pkl."""
+    import joblib
+    from sklearn.linear_model import LinearRegression
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(1000, N_FEATURES))
+    y = X @ rng.normal(size=N_FEATURES) + rng.normal(size=1000)
+    joblib.dump(
+        LinearRegression().fit(X, y), os.path.join(model_dir, "balance_model.pkl")
+    )
+
+
+def run_load(url, clients, requests_per_client, rows_per_request):
+    parsed = urlparse(url)
+    rng = np.random.default_rng(0)
+    body = json.dumps(
+        {"data": rng.normal(size=(rows_per_request, N_FEATURES)).tolist()}
+    ).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+
+    def client(i):
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port)
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            conn.request("POST", parsed.path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            latencies[i].append(time.perf_counter() - start)
+            if response.status != 200:
+                errors[i] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    n_requests = clients * requests_per_client
+    return {
+        "requests": n_requests,
+        "errors": sum(errors),
+        "seconds": elapsed,
+        "requests_per_sec": n_requests / elapsed,
+        "rows_per_sec": n_requests * rows_per_request / elapsed,
+        "p50_ms": float(np.percentile(all_latencies, 50)),
+        "p99_ms": float(np.percentile(all_latencies, 99)),
+    }
+
+
+def run_local(args, max_batch_rows, max_wait_ms):
+    server = score_batching.make_server("127.0.0.1", 0, max_batch_rows, max_wait_ms)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/score"
+        result = run_load(url, args.clients, args.requests, args.rows)
+        batcher = server.batcher
+        result["avg_batch_rows"] = (
+            batcher.rows / batcher.batches if batcher.batches else 0
+        )
+        return result
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.batcher.close()
+
+
+def print_result(label, result):
+    print(
+        f"{label:>10}: {result['requests_per_sec']:,.0f} req/s, "
+        f"{result['rows_per_sec']:,.0f} rows/s, "
+        f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+        f"errors {result['errors']}"
+        + (
+            f", avg batch {result['avg_batch_rows']:.1f} rows"
+            if "avg_batch_rows" in result
+            else ""
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target an already running /score endpoint")
+    parser.add_argument("--model-dir", default=os.getenv("AZUREML_MODEL_DIR"))
+    parser.add_argument(
+        "--synthetic", action="store_true", help="Use a random LinearRegression"
+    )
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Per client")
+    parser.add_argument("--rows", type=int, default=1, help="Rows per request")
+    parser.add_argument("--max-batch-rows", type=int, default=512)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument(
+        "--compare", action="store_true", help="Also run without batching"
+    )
+    args = parser.parse_args()
+
+    if args.url:
+        print_result(
+            "remote", run_load(args.url, args.clients, args.requests, args.rows)
+        )
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = args.model_dir
+        if args.synthetic or not model_dir:
+            write_synthetic_model(tmp)
+            model_dir = tmp
+        os.environ["AZUREML_MODEL_DIR"] = model_dir
+        score.init()
+
+        if args.compare:
+            print_result("unbatched", run_local(args, 1, 0.0))
+        print_result("batched", run_local(args, args.max_batch_rows, args.max_wait_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Blue/green routing and shadow scoring for the local scoring path.
+
+A ServingRouter sits in front of two predict functions, the primary
+(what score.py serves today) and a candidate version:
+
+* ``split``: ``candidate_weight`` of the requests are answered by the
+  candidate. The choice is sticky per request id when one is given.
+* ``shadow``: the primary answers every request; the same rows are scored
+  by the candidate on a background thread pool and only the divergence
+  and latency are recorded, so the response never waits for it. Only
+  ``shadow_sample_rate`` of the requests are mirrored, and when
+  ``max_shadow_pending`` are already queued the shadow call is skipped
+  rather than building a backlog.
+
+Latencies go to the ``model.<name>`` stages of prediction_metrics, so they
+appear in /metrics next to the other stages.
+
+Configured from the environment by ``router_from_env``: ROUTER_MODE
+(off, split or shadow), CANDIDATE_MODEL_VERSION (a MODEL_REGISTRY_DIR
+version) or CANDIDATE_MODEL_PATH, CANDIDATE_WEIGHT,
+SHADOW_SAMPLE_RATE and SHADOW_MAX_PENDING.
+"""
+
+import hashlib
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from prediction_metrics import timed
+
+MODES = ("split", "shadow")
+
+
+class ServingRouter:
+    """Route predictions between a primary and a candidate model."""
+
+    def __init__(
+        self,
+        primary,
+        candidate,
+        mode="shadow",
+        candidate_weight=0.0,
+        primary_name="primary",
+        candidate_name="candidate",
+        shadow_workers=2,
+        shadow_sample_rate=1.0,
+        max_shadow_pending=256,
+        tolerance=0.01,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+        if not 0.0 <= candidate_weight <= 1.0:
+            raise ValueError("candidate_weight must be between 0 and 1")
+        self.primary = primary
+        self.candidate = candidate
+        self.mode = mode
+        self.candidate_weight = candidate_weight
+        self.primary_name = primary_name
+        self.candidate_name = candidate_name
+        self.shadow_sample_rate = shadow_sample_rate
+        self.max_shadow_pending = max_shadow_pending
+        self.tolerance = tolerance
+        self._executor = ThreadPoolExecutor(
+            max_workers=shadow_workers, thread_name_prefix="shadow"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.routed = {primary_name: 0, candidate_name: 0}
+        self.shadow = {
+            "scored": 0,
+            "skipped": 0,
+            "errors": 0,
+            "rows": 0,
+            "abs_diff_sum": 0.0,
+            "rel_diff_sum": 0.0,
+            "max_abs_diff": 0.0,
+            "rows_over_tolerance": 0,
+        }
+
+    def _use_candidate(self, request_id):
+        if self.candidate_weight <= 0.0:
+            return False
+        if request_id:
+            digest = hashlib.blake2b(request_id.encode("utf-8"), digest_size=8)
+            bucket = int.from_bytes(digest.digest(), "big") / 2.0**64
+        else:
+            bucket = random.random()
+        return bucket < self.candidate_weight
+
+    def _score(self, name, predict_fn, X):
+        with timed(f"model.{name}"):
+            return np.asarray(predict_fn(X), dtype=np.float64)
+
+    def predict(self, X, request_id=None):
+        if self.mode == "split" and self._use_candidate(request_id):
+            name, predict_fn = self.candidate_name, self.candidate
+        else:
+            name, predict_fn = self.primary_name, self.primary
+        predictions = self._score(name, predict_fn, X)
+        shadow = self.mode == "shadow" and (
+            self.shadow_sample_rate >= 1.0 or random.random() < self.shadow_sample_rate
+        )
+        with self._lock:
+            self.routed[name] += 1
+            if shadow and self._pending >= self.max_shadow_pending:
+                self.shadow["skipped"] += 1
+                shadow = False
+            elif shadow:
+                self._pending += 1
+        if shadow:
+            self._executor.submit(self._shadow_score, X, predictions)
+        return predictions
+
+    def _shadow_score(self, X, primary_predictions):
+        try:
+            candidate_predictions = self._score(self.candidate_name, self.candidate, X)
+            diff = np.abs(candidate_predictions - primary_predictions)
+            rel = diff / np.maximum(np.abs(primary_predictions), 1e-9)
+            with self._lock:
+                s = self.shadow
+                s["scored"] += 1
+                s["rows"] += len(diff)
+                s["abs_diff_sum"] += float(diff.sum())
+                s["rel_diff_sum"] += float(rel.sum())
+                s["max_abs_diff"] = max(s["max_abs_diff"], float(diff.max(initial=0)))
+                s["rows_over_tolerance"] += int((rel > self.tolerance).sum())
+        except Exception:
+            with self._lock:
+                self.shadow["errors"] += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            s = dict(self.shadow)
+            routed = dict(self.routed)
+            pending = self._pending
+        rows = s.pop("rows")
+        stats = {
+            "mode": self.mode,
+            "candidate_weight": self.candidate_weight,
+            "routed": routed,
+        }
+        if self.mode == "shadow":
+            stats["shadow"] = {
+                "scored": s["scored"],
+                "skipped": s["skipped"],
+                "errors": s["errors"],
+                "pending": pending,
+                "rows": rows,
+                "mean_abs_diff": s["abs_diff_sum"] / rows if rows else 0.0,
+                "mean_rel_diff": s["rel_diff_sum"] / rows if rows else 0.0,
+                "max_abs_diff": s["max_abs_diff"],
+                "share_over_tolerance": (
+                    s["rows_over_tolerance"] / rows if rows else 0.0
+                ),
+            }
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def load_candidate_from_env():
+    """(name, model) for CANDIDATE_MODEL_VERSION or CANDIDATE_MODEL_PATH."""
+    version = os.getenv("CANDIDATE_MODEL_VERSION")
+    if version:
+        from model_registry import ModelRegistry
+
+        registry = ModelRegistry(os.environ["MODEL_REGISTRY_DIR"])
+        return version, registry.load(version)
+    path = os.getenv("CANDIDATE_MODEL_PATH")
+    if path:
+        from compiled_model import load_model
+
+        return os.path.basename(path), load_model(path)
+    raise ValueError(
+        "ROUTER_MODE needs CANDIDATE_MODEL_VERSION or CANDIDATE_MODEL_PATH"
+    )
+
+
+def router_from_env(primary, primary_name="primary"):
+    """Build a ServingRouter from the environment, or None if ROUTER_MODE=off."""
+    mode = os.getenv("ROUTER_MODE", "off")
+    if mode == "off":
+        return None
+    candidate_name, candidate = load_candidate_from_env()
+    return ServingRouter(
+        primary,
+        candidate.predict,
+        mode=mode,
+        candidate_weight=float(os.getenv("CANDIDATE_WEIGHT", "0")),
+        primary_name=primary_name,
+        candidate_name=candidate_name,
+        shadow_sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "1")),
+        max_shadow_pending=int(os.getenv("SHADOW_MAX_PENDING", "256")),
+    )
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+def json_default(value):
+    """Convert NumPy/pandas scalars that json cannot serialize natively."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def to_json_types(summary):
+    """``summary`` as it reads back from the cache: str keys, built-in scalars."""
+    return json.loads(json.dumps(summary, default=json_default))
+
+
+class SummaryCache:
+    """On-disk cache of file summaries keyed by file content and parameters.
+
+    Each entry is a single JSON file in ``cache_dir``. The file's mtime is
+    bumped on every hit, so evicting the oldest mtimes first gives LRU order
+    without keeping a separate index that could drift from the directory.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, chunk_size=1 << 20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        # (path, size, mtime_ns) -> digest, so an unchanged file is hashed once
+        self._digests = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_digest(self, file_path):
+        """Return the SHA-256 hex digest of the file contents."""
+        st = os.stat(file_path)
+        stamp = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            self._digests[stamp] = digest
+        return digest
+
+    def make_key(self, file_path, **params):
+        """Build a cache key from the file digest and the summary parameters."""
+        payload = json.dumps(
+            {"file": self.file_digest(file_path), "params": params},
+            sort_keys=True,
+            default=json_default,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached summary for ``key`` or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return summary
+
+    def put(self, key, summary):
+        """Store ``summary`` under ``key`` and evict old entries if needed."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(summary, f, default=json_default)
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            st = entry.stat()
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Remove every cached summary."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                os.remove(entry.path)
@@ -0,0 +1,148 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from file_summary_service import FileSummaryService
+from summary_cache import SummaryCache
+
+
+def _run_job(job_id, file_path, output_path, params, service_kwargs, cache_dir, events):
+    """Worker-process entry point: summarize one file and save it as JSON."""
+
+    def emit(event):
+        events.put((job_id, time.time(), event))
+
+    emit({"step": "started"})
+    cache = SummaryCache(cache_dir) if cache_dir else None
+    service = FileSummaryService(
+        file_path, cache=cache, progress=emit, **service_kwargs
+    )
+    service.generate_summary(**params)
+    service.save_summary(output_path)
+    return output_path
+
+
+class SummaryJobQueue:
+    """Run FileSummaryService summaries in a bounded pool of worker processes.
+
+    ``submit`` returns a job id immediately. Workers push progress events
+    (one per analyzed column, plus load/clustering/anomaly steps) onto a
+    shared queue that ``status`` drains, so a web request can poll for
+    progress without blocking on the summary itself.
+    """
+
+    def __init__(self, output_dir, max_workers=2, cache_dir=None):
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._manager = multiprocessing.Manager()
+        self._events = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_path, n_clusters=3, contamination=0.1, **service_kwargs):
+        """Queue a summary job and return its id."""
+        job_id = uuid.uuid4().hex
+        output_path = os.path.join(self.output_dir, f"{job_id}.json")
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "file_path": file_path,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "finished_at": None,
+                "result_path": None,
+                "error": None,
+                "events": [],
+            }
+        future = self._pool.submit(
+            _run_job,
+            job_id,
+            file_path,
+            output_path,
+            {"n_clusters": n_clusters, "contamination": contamination},
+            service_kwargs,
+            self.cache_dir,
+            self._events,
+        )
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def _finish(self, job_id, future):
+        self._drain()
+        with self._lock:
+            job = self._jobs[job_id]
+            job["finished_at"] = time.time()
+            error = future.exception()
+            if error is None:
+                job["status"] = "finished"
+                job["result_path"] = future.result()
+            else:
+                job["status"] = "failed"
+                job["error"] = "".join(
+                    traceback.format_exception_only(type(error), error)
+                ).strip()
+
+    def _drain(self):
+        while True:
+            try:
+                job_id, timestamp, event = self._events.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job["events"].append({"time": timestamp, **event})
+                if job["status"] == "queued":
+                    job["status"] = "running"
+
+    def status(self, job_id, since=0):
+        """Return the job state and the progress events from index ``since`` on."""
+        self._drain()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(f"Unknown job: {job_id}")
+            columns = [e for e in job["events"] if e["step"] == "column"]
+            progress = None
+            if columns:
+                progress = {"done": columns[-1]["done"], "total": columns[-1]["total"]}
+            state = {k: v for k, v in job.items() if k != "events"}
+            state["progress"] = progress
+            state["events"] = job["events"][since:]
+            state["next_event"] = len(job["events"])
+            return state
+
+    def result(self, job_id):
+        """Return the saved summary of a finished job, or None if not finished."""
+        state = self.status(job_id)
+        if state["status"] == "failed":
+            raise Exception(f"Summary job {job_id} failed: {state['error']}")
+        if state["status"] != "finished":
+            return None
+        with open(state["result_path"], "r") as f:
+            return json.load(f)
+
+    def wait(self, job_id, timeout=None, poll_interval=0.1):
+        """Block until the job finishes or fails; returns its final status."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            state = self.status(job_id)
+            if state["status"] in ("finished", "failed"):
+                return state
+            if deadline is not None and time.time() >= deadline:
+                return state
+            time.sleep(poll_interval)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+        self._drain()
+        self._manager.shutdown()
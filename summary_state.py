@@ -0,0 +1,376 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from summary_cache import json_default
+
+STATE_VERSION = 1
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch made of weighted centroids.
+
+    While fewer than ``max_size`` values have been seen every centroid has
+    weight 1 and quantiles are exact (pandas' linear interpolation). Beyond
+    that, neighbouring centroids are merged into equal-weight buckets.
+    """
+
+    def __init__(self, max_size=512, values=None, weights=None):
+        self.max_size = max_size
+        self.values = np.asarray(values if values is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self._absorb(values, np.ones(len(values)))
+
+    def merge(self, other):
+        self._absorb(other.values, other.weights)
+
+    def _absorb(self, values, weights):
+        if len(values) == 0:
+            return
+        values = np.concatenate([self.values, values])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(values, kind="stable")
+        values, weights = values[order], weights[order]
+        if len(values) > self.max_size:
+            cum = np.cumsum(weights)
+            bucket = np.minimum(
+                (cum - weights / 2) * self.max_size // cum[-1], self.max_size - 1
+            ).astype(int)
+            bucket_weights = np.bincount(bucket, weights=weights)
+            bucket_sums = np.bincount(bucket, weights=values * weights)
+            keep = bucket_weights > 0
+            weights = bucket_weights[keep]
+            values = bucket_sums[keep] / weights
+        self.values, self.weights = values, weights
+
+    def _positions(self):
+        # 0-based rank of each centroid's middle element
+        return np.cumsum(self.weights) - (self.weights + 1) / 2
+
+    def quantile(self, q):
+        if len(self.values) == 0:
+            return np.nan
+        target = q * (self.total - 1)
+        return float(np.interp(target, self._positions(), self.values))
+
+    def count_below(self, x):
+        """Estimated number of values strictly below ``x``."""
+        if len(self.values) == 0:
+            return 0.0
+        if np.all(self.weights == 1):
+            return float(np.searchsorted(self.values, x, side="left"))
+        mid = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(x, self.values, mid, left=0.0, right=self.total))
+
+    def to_dict(self):
+        return {
+            "max_size": self.max_size,
+            "values": self.values.tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["max_size"], d["values"], d["weights"])
+
+
+class NumericState:
+    """Counts, moments, extremes and a quantile sketch for a numeric column."""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch()
+
+    def update(self, series):
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+        present = values[~np.isnan(values)]
+        self.missing += int(len(values) - len(present))
+        if len(present) == 0:
+            return
+        n = len(present)
+        mean = float(present.mean())
+        m2 = float(((present - mean) ** 2).sum())
+        # Chan et al. parallel combination of (count, mean, M2)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.count * n / total
+        self.count = total
+        lo, hi = float(present.min()), float(present.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.sketch.add(present)
+
+    def stats(self):
+        rows = self.count + self.missing
+        q1, q3 = self.sketch.quantile(0.25), self.sketch.quantile(0.75)
+        iqr = q3 - q1
+        outliers = self.sketch.count_below(q1 - 1.5 * iqr) + (
+            self.count - self.sketch.count_below(np.nextafter(q3 + 1.5 * iqr, np.inf))
+        )
+        return {
+            "mean": self.mean if self.count else np.nan,
+            "median": self.sketch.quantile(0.5),
+            "std": (
+                float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+            ),
+            "min": self.min,
+            "max": self.max,
+            "missing": self.missing / rows * 100 if rows else np.nan,
+            "outliers": int(round(outliers)),
+        }
+
+    def to_dict(self):
+        d = {
+            k: getattr(self, k)
+            for k in ("count", "missing", "mean", "m2", "min", "max")
+        }
+        d["sketch"] = self.sketch.to_dict()
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls()
+        for key in ("count", "missing", "mean", "m2", "min", "max"):
+            setattr(state, key, d[key])
+        state.sketch = QuantileSketch.from_dict(d["sketch"])
+        return state
+
+
+class CategoricalState:
+    """Value frequencies for a categorical column, capped at ``max_values``.
+
+    When the cap is exceeded only the most frequent values are kept, so
+    ``unique_values`` becomes a lower bound and ``truncated`` is set.
+    """
+
+    def __init__(self, max_values=10000):
+        self.max_values = max_values
+        self.counts = {}
+        self.missing = 0
+        self.rows = 0
+        self.truncated = False
+
+    def update(self, series):
+        self.rows += len(series)
+        self.missing += int(series.isna().sum())
+        for value, count in series.dropna().astype(str).value_counts().items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        if len(self.counts) > self.max_values:
+            top = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+            self.counts = dict(top[: self.max_values])
+            self.truncated = True
+
+    def stats(self):
+        most_common = None
+        if self.counts:
+            # ties resolve to the smallest value, like Series.mode()
+            most_common = min(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[0]
+        return {
+            "unique_values": len(self.counts),
+            "most_common": most_common,
+            "missing": self.missing / self.rows * 100 if self.rows else np.nan,
+        }
+
+    def to_dict(self):
+        return {
+            "max_values": self.max_values,
+            "counts": self.counts,
+            "missing": self.missing,
+            "rows": self.rows,
+            "truncated": self.truncated,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls(d["max_values"])
+        state.counts = d["counts"]
+        state.missing = d["missing"]
+        state.rows = d["rows"]
+        state.truncated = d["truncated"]
+        return state
+
+
+class ClusterState:
+    """K-means centroids with their member counts.
+
+    New rows are merged by re-running weighted K-means over the stored
+    centroids (weighted by their counts) plus the new rows, seeded with the
+    previous centroids.
+    """
+
+    def __init__(self, n_clusters=3, centers=None, counts=None):
+        self.n_clusters = n_clusters
+        self.centers = centers
+        self.counts = counts
+
+    def update(self, X):
+        X = np.asarray(X, dtype=float)
+        weights = np.ones(len(X))
+        init = "k-means++"
+        n_init = 10
+        if self.centers is not None:
+            centers = np.asarray(self.centers, dtype=float)
+            X = np.vstack([centers, X])
+            weights = np.concatenate([np.asarray(self.counts, dtype=float), weights])
+            init = None
+        if len(X) < self.n_clusters:
+            return
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X, sample_weight=weights)
+        if init is None:
+            init = X_scaled[: self.n_clusters]
+            n_init = 1
+        kmeans = KMeans(
+            n_clusters=self.n_clusters, init=init, n_init=n_init, random_state=42
+        )
+        labels = kmeans.fit_predict(X_scaled, sample_weight=weights)
+        self.centers = scaler.inverse_transform(kmeans.cluster_centers_).tolist()
+        self.counts = np.bincount(
+            labels, weights=weights, minlength=self.n_clusters
+        ).tolist()
+
+    def summary(self):
+        if self.centers is None:
+            return "Not enough data for clustering"
+        return {
+            "cluster_counts": {i: int(round(c)) for i, c in enumerate(self.counts)},
+            "cluster_centers": self.centers,
+        }
+
+    def to_dict(self):
+        return {
+            "n_clusters": self.n_clusters,
+            "centers": self.centers,
+            "counts": self.counts,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["n_clusters"], d["centers"], d["counts"])
+
+
+class SummaryState:
+    """Mergeable summary of a file, persisted so appended rows can be folded in.
+
+    ``offset`` is the byte position (CSV) or data row count (XLSX) up to
+    which the file has been processed, and ``fingerprint`` guards against
+    the already-processed part of the file having been rewritten.
+    """
+
+    def __init__(self, columns, numerical_columns, n_clusters=3):
+        self.columns = list(columns)
+        self.numerical_columns = list(numerical_columns)
+        self.rows = 0
+        self.offset = 0
+        self.fingerprint = None
+        self.numeric = {col: NumericState() for col in self.numerical_columns}
+        self.categorical = {
+            col: CategoricalState() for col in self.columns if col not in self.numeric
+        }
+        self.clusters = ClusterState(n_clusters)
+
+    @classmethod
+    def from_frame(cls, data, n_clusters=3):
+        numerical_columns = data.select_dtypes(include=[np.number]).columns.tolist()
+        state = cls(data.columns, numerical_columns, n_clusters)
+        state.update(data)
+        return state
+
+    def update(self, data):
+        """Fold a batch of rows into the state."""
+        self.rows += len(data)
+        for col, col_state in self.numeric.items():
+            col_state.update(data[col])
+        for col, col_state in self.categorical.items():
+            col_state.update(data[col])
+        if self.numerical_columns:
+            X = (
+                data[self.numerical_columns]
+                .apply(pd.to_numeric, errors="coerce")
+                .dropna()
+            )
+            if len(X):
+                self.clusters.update(X.to_numpy())
+
+    def to_summary(self, file_name):
+        column_details = {}
+        for col in self.columns:
+            if col in self.numeric:
+                column_details[col] = self.numeric[col].stats()
+            else:
+                column_details[col] = self.categorical[col].stats()
+        return {
+            "file_name": file_name,
+            "rows": self.rows,
+            "columns": len(self.columns),
+            "column_details": column_details,
+            "clustering": self.clusters.summary() if self.numerical_columns else None,
+        }
+
+    def to_dict(self):
+        return {
+            "version": STATE_VERSION,
+            "columns": self.columns,
+            "numerical_columns": self.numerical_columns,
+            "rows": self.rows,
+            "offset": self.offset,
+            "fingerprint": self.fingerprint,
+            "numeric": {col: s.to_dict() for col, s in self.numeric.items()},
+            "categorical": {col: s.to_dict() for col, s in self.categorical.items()},
+            "clusters": self.clusters.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls(d["columns"], d["numerical_columns"], d["clusters"]["n_clusters"])
+        state.rows = d["rows"]
+        state.offset = d["offset"]
+        state.fingerprint = d["fingerprint"]
+        state.numeric = {
+            col: NumericState.from_dict(s) for col, s in d["numeric"].items()
+        }
+        state.categorical = {
+            col: CategoricalState.from_dict(s) for col, s in d["categorical"].items()
+        }
+        state.clusters = ClusterState.from_dict(d["clusters"])
+        return state
+
+    def save(self, path):
+        """Atomically write the state as JSON."""
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+        )
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.to_dict(), f, default=json_default)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved state, or return None if missing or incompatible."""
+        try:
+            with open(path, "r") as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if d.get("version") != STATE_VERSION:
+            return None
+        return cls.from_dict(d)
@@ -0,0 +1,66 @@
+"""The body app.py posts in remote mode must be scoreable by score.run."""
+
+import json
+import os
+
+import pytest
+
+from local_stubs import make_stub_llm, start_stub_scoring_server
+
+INPUTS = [
+    "120 journals totalling 48k averaging 400",
+    "forecast request with roughly usual activity",
+]
+
+
+@pytest.fixture
+def remote_app(monkeypatch):
+    stub_server, stub_url = start_stub_scoring_server(latency_ms=0)
+    monkeypatch.setenv("SCORING_MODE", "remote")
+    monkeypatch.setenv("AZURE_ML_URL", stub_url)
+    import app as app_module
+    import openai_interface
+
+    monkeypatch.setattr(app_module, "AZURE_ML_URL", stub_url)
+    monkeypatch.setattr(openai_interface, "extract_with_llm", make_stub_llm(0))
+    sent = []
+    post = app_module.scoring_session.post
+
+    def capture(url, json=None, **kwargs):
+        sent.append(json)
+        return post(url, json=json, **kwargs)
+
+    monkeypatch.setattr(app_module.scoring_session, "post", capture)
+    yield app_module.app.test_client(), sent
+    stub_server.shutdown()
+
+
+@pytest.fixture
+def score_module(tmp_path, monkeypatch):
+    from score_load_test import write_synthetic_model
+
+    write_synthetic_model(str(tmp_path))
+    monkeypatch.setenv("AZUREML_MODEL_DIR", str(tmp_path))
+    for name in ("MODEL_REGISTRY_DIR", "ROUTER_MODE", "DRIFT_REFERENCE"):
+        monkeypatch.delenv(name, raising=False)
+    import score
+
+    score.init()
+    return score
+
+
+@pytest.mark.parametrize(
+    "path, body, n_rows",
+    [
+        ("/predict-from-nl", {"input": INPUTS[0]}, 1),
+        ("/predict-from-nl/batch", {"inputs": INPUTS}, 2),
+    ],
+)
+def test_remote_payload_scores(remote_app, score_module, path, body, n_rows):
+    client, sent = remote_app
+    response = client.post(path, json=body)
+    assert response.status_code == 200, response.get_json()
+    (payload,) = sent
+    predictions = score_module.run(json.dumps(payload).encode("utf-8"))
+    assert len(predictions) == n_rows
+    assert all(isinstance(p, float) for p in predictions)
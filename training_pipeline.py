@@ -0,0 +1,388 @@
+"""Reproducible training pipeline for the balance model (from train_predict.ipynb).
+
+balance_records.json and journal_entries.json are streamed record by
+record (ijson for JSON arrays, line by line for .ndjson/.jsonl) and turned
+into DataFrames chunk by chunk. Journal entries are reduced to partial
+per-(date, SAP_BOOK_ID) sums and counts as they arrive, so memory grows
+with the aggregated feature frame rather than with the raw JSON.
+
+    python training_pipeline.py --source local --data-dir ./data
+    python training_pipeline.py --source blob --container journaldata
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from compiled_model import FEATURE_COLUMNS, export_model
+from drift_monitor import build_reference, save_reference
+from feature_store import JournalFeatureStore, add_average
+from model_fleet import ModelFleet
+from model_registry import ModelRegistry
+from training_join import join_partition, join_training_frame
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+BALANCE_COLUMNS = ["DATE", "SAP_BOOK_ID", "BALANCE"]
+JOURNAL_COLUMNS = ["ENTRY_DATE", "SAP_BOOK_ID", "VALUE"]
+TARGET_COLUMN = "BALANCE"
+
+
+class LocalFileSource:
+    """Read the training JSON files from a local directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def open(self, name):
+        return open(os.path.join(self.directory, name), "rb")
+
+
+class _ChunkStream(io.RawIOBase):
+    """File-like wrapper over an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+class BlobSource:
+    """Stream the training JSON files from Azure Blob Storage."""
+
+    def __init__(self, connection_string, container):
+        from azure.storage.blob import BlobServiceClient
+
+        self.service = BlobServiceClient.from_connection_string(connection_string)
+        self.container = container
+
+    def open(self, name):
+        blob = self.service.get_blob_client(container=self.container, blob=name)
+        stream = _ChunkStream(blob.download_blob().chunks())
+        return io.BufferedReader(stream, buffer_size=1 << 20)
+
+
+def iter_records(stream, name):
+    """Yield records from a JSON array or NDJSON stream without loading it whole."""
+    if name.endswith((".ndjson", ".jsonl")):
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+    elif ijson is not None:
+        yield from ijson.items(stream, "item", use_float=True)
+    else:
+        warnings.warn(f"ijson is not installed; loading {name} in one piece")
+        yield from json.load(stream)
+
+
+def iter_frames(records, columns, chunk_size=100_000):
+    """Group records into DataFrames of at most ``chunk_size`` rows."""
+    chunk = []
+    for record in records:
+        chunk.append(tuple(record.get(col) for col in columns))
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame.from_records(chunk, columns=columns)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame.from_records(chunk, columns=columns)
+
+
+def prepare_balances(frame):
+    frame["DATE"] = pd.to_datetime(frame["DATE"])
+    frame["BALANCE"] = pd.to_numeric(frame["BALANCE"], errors="coerce")
+    return frame.dropna(subset=["BALANCE"])
+
+
+def load_balances(source, name="balance_records.json", chunk_size=100_000):
+    with source.open(name) as stream:
+        frames = [
+            prepare_balances(frame)
+            for frame in iter_frames(
+                iter_records(stream, name), BALANCE_COLUMNS, chunk_size
+            )
+        ]
+    df = pd.concat(frames, ignore_index=True)
+    df.sort_values("DATE", inplace=True, kind="stable")
+    df["YEAR"] = df["DATE"].dt.year
+    return df
+
+
+def partial_journal_agg(frame):
+    """Per-chunk sum and count of VALUE by (DATE, SAP_BOOK_ID)."""
+    frame["DATE"] = pd.to_datetime(frame["ENTRY_DATE"]).dt.normalize()
+    frame["VALUE"] = pd.to_numeric(frame["VALUE"], errors="coerce")
+    return frame.groupby(["DATE", "SAP_BOOK_ID"]).agg(
+        JOURNAL_TOTAL_AMOUNT=("VALUE", "sum"),
+        JOURNAL_COUNT=("VALUE", "count"),
+    )
+
+
+def combine_journal_agg(partials):
+    """Merge partial aggregates into the notebook's journal_agg frame."""
+    agg = add_average(pd.concat(partials).groupby(level=["DATE", "SAP_BOOK_ID"]).sum())
+    return agg.reset_index()[
+        [
+            "DATE",
+            "SAP_BOOK_ID",
+            "JOURNAL_TOTAL_AMOUNT",
+            "JOURNAL_AVG_AMOUNT",
+            "JOURNAL_COUNT",
+        ]
+    ]
+
+
+def load_journal_agg(source, name="journal_entries.json", chunk_size=100_000):
+    with source.open(name) as stream:
+        partials = [
+            partial_journal_agg(frame)
+            for frame in iter_frames(
+                iter_records(stream, name), JOURNAL_COLUMNS, chunk_size
+            )
+        ]
+    return combine_journal_agg(partials)
+
+
+def update_feature_store(
+    source, store, name="journal_entries.json", chunk_size=100_000
+):
+    """Append journal dates newer than the store's watermark."""
+    with source.open(name) as stream:
+        return store.update(
+            partial_journal_agg(frame)
+            for frame in iter_frames(
+                iter_records(stream, name), JOURNAL_COLUMNS, chunk_size
+            )
+        )
+
+
+def build_training_frame(df, journal_agg):
+    """The notebook's exact same-day join; see training_join for as-of joins."""
+    return join_partition(df, journal_agg)
+
+
+def evaluate(model, X, y, groups=None):
+    y_pred = model.predict(X) if groups is None else model.predict(X, groups)
+    return {
+        "mae": float(mean_absolute_error(y, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y, y_pred))),
+        "r2": float(r2_score(y, y_pred)),
+    }
+
+
+def train(merged_df, split_year=2022):
+    """Fit on YEAR <= split_year and evaluate on later years."""
+    train_df = merged_df[merged_df["YEAR"] <= split_year]
+    test_df = merged_df[merged_df["YEAR"] > split_year]
+    model = LinearRegression()
+    model.fit(train_df[FEATURE_COLUMNS], train_df[TARGET_COLUMN])
+    metrics = None
+    if len(test_df):
+        metrics = evaluate(model, test_df[FEATURE_COLUMNS], test_df[TARGET_COLUMN])
+    return model, metrics
+
+
+def train_fleet(merged_df, split_year=2022, min_rows=20, alpha=1e-3):
+    """Fit one linear model per SAP_BOOK_ID; same split as ``train``."""
+    train_df = merged_df[merged_df["YEAR"] <= split_year]
+    test_df = merged_df[merged_df["YEAR"] > split_year]
+    fleet = ModelFleet(min_rows=min_rows, alpha=alpha).fit(
+        train_df[FEATURE_COLUMNS], train_df[TARGET_COLUMN], train_df["SAP_BOOK_ID"]
+    )
+    metrics = None
+    if len(test_df):
+        metrics = evaluate(
+            fleet,
+            test_df[FEATURE_COLUMNS],
+            test_df[TARGET_COLUMN],
+            test_df["SAP_BOOK_ID"],
+        )
+    return fleet, metrics
+
+
+def print_metrics(metrics):
+    print(
+        f"MAE: {metrics['mae']:.2f}, RMSE: {metrics['rmse']:.2f}, "
+        f"R²: {metrics['r2']:.2f}"
+    )
+
+
+def training_metadata(merged_df, split_year, metrics):
+    """Registry metadata for a model trained by ``train``."""
+    train_dates = merged_df.loc[merged_df["YEAR"] <= split_year, "DATE"]
+    return {
+        "features": FEATURE_COLUMNS,
+        "target": TARGET_COLUMN,
+        "metrics": metrics or {},
+        "split_year": split_year,
+        "training_rows": int(len(train_dates)),
+        "training_window": {
+            "start": train_dates.min().date().isoformat(),
+            "end": train_dates.max().date().isoformat(),
+        },
+    }
+
+
+def register_model(model_path, config_path="config.json"):
+    from azureml.core import Model, Workspace
+
+    ws = Workspace.from_config(path=config_path)
+    return Model.register(
+        workspace=ws,
+        model_path=model_path,
+        model_name="balance-predictor",
+        description="Linear regression model for predicting balance",
+    )
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_source(args):
+    if args.source == "blob":
+        connection_string = (
+            args.connection_string or os.environ["AZURE_STORAGE_CONNECTION_STRING"]
+        )
+        return BlobSource(connection_string, args.container)
+    return LocalFileSource(args.data_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=["local", "blob"], default="local")
+    parser.add_argument("--data-dir", default=".")
+    parser.add_argument("--connection-string")
+    parser.add_argument("--container", default="journaldata")
+    parser.add_argument("--balance-file", default="balance_records.json")
+    parser.add_argument("--journal-file", default="journal_entries.json")
+    parser.add_argument(
+        "--feature-store",
+        help="Journal aggregate store to update incrementally and train from",
+    )
+    parser.add_argument(
+        "--asof-tolerance-days",
+        type=int,
+        help="Use the latest journal aggregate up to this many days old "
+        "instead of dropping balances without same-day journals",
+    )
+    parser.add_argument("--join-partitions", type=int, default=8)
+    parser.add_argument("--join-jobs", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--split-year", type=int, default=2022)
+    parser.add_argument("--output", default="balance_model.pkl")
+    parser.add_argument(
+        "--fleet", help="Also fit per-SAP_BOOK_ID models and save them here (.npz)"
+    )
+    parser.add_argument("--registry", help="Local model registry directory")
+    parser.add_argument(
+        "--promote", action="store_true", help="Make the new registry version current"
+    )
+    parser.add_argument("--register", action="store_true", help="Register in Azure ML")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    source = make_source(args)
+    df = load_balances(source, args.balance_file, args.chunk_size)
+    if args.feature_store:
+        store = JournalFeatureStore(args.feature_store)
+        update = update_feature_store(source, store, args.journal_file, args.chunk_size)
+        print(
+            f"Feature store: {update['rows']:,} new aggregates, "
+            f"{update['skipped']:,} already stored, watermark {store.manifest['watermark']}"
+        )
+        # each join partition reads only its own books from the store
+        journals = args.feature_store
+    else:
+        journals = load_journal_agg(source, args.journal_file, args.chunk_size)
+        print(f"Loaded {len(journals):,} journal aggregates")
+    merged_df = join_training_frame(
+        df,
+        journals,
+        tolerance_days=args.asof_tolerance_days,
+        n_partitions=args.join_partitions,
+        n_jobs=args.join_jobs,
+    )
+    print(f"Loaded {len(df):,} balances, {len(merged_df):,} training rows")
+
+    model, metrics = train(merged_df, args.split_year)
+    joblib.dump(model, args.output)
+    compiled_path = export_model(model, os.path.splitext(args.output)[0] + ".npz")
+    print(f"✅ Model saved: {args.output} (+ {compiled_path})")
+    if metrics:
+        print_metrics(metrics)
+    train_df = merged_df[merged_df["YEAR"] <= args.split_year]
+    reference_path = save_reference(
+        build_reference(
+            train_df,
+            model.predict(train_df[FEATURE_COLUMNS]),
+            (metrics or {}).get("mae"),
+        ),
+        os.path.splitext(args.output)[0] + "_drift.json",
+    )
+    print(f"✅ Drift reference saved: {reference_path}")
+    if args.fleet:
+        fleet, fleet_metrics = train_fleet(merged_df, args.split_year)
+        fleet.save(args.fleet)
+        X, groups = merged_df[FEATURE_COLUMNS], merged_df["SAP_BOOK_ID"]
+        diff = np.abs(
+            ModelFleet.load(args.fleet).predict(X, groups) - fleet.predict(X, groups)
+        ).max(initial=0)
+        print(
+            f"✅ Fleet saved: {args.fleet} ({fleet.n_books:,} book models, "
+            f"reload max abs diff {diff:.3g})"
+        )
+        if fleet_metrics:
+            print_metrics(fleet_metrics)
+    if args.registry:
+        registry = ModelRegistry(args.registry)
+        version = registry.register(
+            [compiled_path, args.output, reference_path],
+            training_metadata(merged_df, args.split_year, metrics),
+        )
+        print(f"✅ Registry version: {version}")
+        if args.promote:
+            registry.promote(version)
+            print(f"✅ Promoted {version}")
+    if args.register:
+        registered = register_model(args.output)
+        print("✅ Model registered:", registered.name)
+
+    memory = peak_memory_mb()
+    print(
+        f"Done in {time.perf_counter() - start:.1f}s"
+        + (f", peak RSS {memory:,.0f} MB" if memory else "")
+    )
+
+
+if __name__ == "__main__":
+    main()